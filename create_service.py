@@ -29,6 +29,7 @@ Type=simple
 User={user}
 WorkingDirectory={cwd}
 ExecStart={python_path} {os.path.join(cwd, 'plex_monitor.py')}
+ExecReload=/bin/kill -HUP $MAINPID
 Restart=on-failure
 RestartSec=10
 StandardOutput=syslog
@@ -1,14 +1,71 @@
+import base64
+import collections
+import datetime
+import gc
+import hashlib
+import hmac
+import http.server
+import importlib
+import io
 import json
+import re
 import requests
+import signal
 import time
 import logging
+import logging.handlers
+import multiprocessing
 import os
-from plexapi.server import PlexServer
-from plexapi.exceptions import NotFound, Unauthorized
-from pyarr import RadarrAPI, SonarrAPI
+import queue
+import socket
+import sys
+import threading
+import urllib.parse
 from requests.exceptions import ConnectionError as ReqConnectionError, HTTPError
-import qbittorrentapi
-from qbittorrentapi.exceptions import APIConnectionError, LoginFailed, APIError
+
+try:
+    import fcntl # Used for HA leader election; not available on Windows
+except ImportError:
+    fcntl = None
+
+try:
+    import resource # Used for the startup memory report; not available on Windows
+except ImportError:
+    resource = None
+
+STARTUP_TIME = time.perf_counter()
+
+# --- Service Client Libraries ---
+# These are imported on first use by the probe that needs them (see load_service_library),
+# so deployments that only monitor a few services don't pay for the rest at startup.
+PlexServer = None
+NotFound = None
+Unauthorized = None
+RadarrAPI = None
+SonarrAPI = None
+qbittorrentapi = None
+APIConnectionError = None
+LoginFailed = None
+APIError = None
+
+SERVICE_LIBRARIES = {
+    "plexapi": {
+        "PlexServer": ("plexapi.server", "PlexServer"),
+        "NotFound": ("plexapi.exceptions", "NotFound"),
+        "Unauthorized": ("plexapi.exceptions", "Unauthorized"),
+    },
+    "pyarr": {
+        "RadarrAPI": ("pyarr", "RadarrAPI"),
+        "SonarrAPI": ("pyarr", "SonarrAPI"),
+    },
+    "qbittorrentapi": {
+        "qbittorrentapi": ("qbittorrentapi", None),
+        "APIConnectionError": ("qbittorrentapi.exceptions", "APIConnectionError"),
+        "LoginFailed": ("qbittorrentapi.exceptions", "LoginFailed"),
+        "APIError": ("qbittorrentapi.exceptions", "APIError"),
+    },
+}
+library_load_times = {} # library -> seconds spent importing it
 
 # --- Configuration ---
 CONFIG_FILE = os.environ.get('CONFIG_PATH', 'config.json')
@@ -25,9 +82,579 @@ logging.basicConfig(
 )
 
 # --- Global Variables ---
-discord_message_id = None
+log_listener = None # QueueListener doing log I/O off the polling thread (see setup_logging)
+http_session = None # Shared requests.Session used by the JSON API probes
+http_cache_config = {"enabled": True, "ttl_seconds": 300}
+pipeline_config = {"enabled": False, "max_items": 100, "stall_minutes": 10}
+timeout_config = {"adaptive": True, "multiplier": 3.0, "min_samples": 10, "history_size": 100,
+                  "connect_floor": 0.25, "connect_cap": 10.0, "read_floor": 0.75, "read_cap": 20.0,
+                  "cycle_budget_seconds": 45}
+service_timeout_overrides = {} # service -> (connect, read) from its "timeout" setting
+latency_history = {} # service -> deque of recent response times (seconds)
+timeout_strikes = {} # service -> consecutive timed-out requests
+cycle_deadline = None # perf_counter() value the current poll should finish by
+qbittorrent_sync_state = {} # host_url -> {"client", "rid", "torrents": {hash: {field: value}}}
+pipeline_state = {"torrents": {}, "sab_slots": {}, "rows": {}, "inputs": {}, "zero_speed_since": {}}
+response_cache = {} # cache key -> {"etag", "last_modified", "data", "fetched_at"}
+current_statuses = {} # Latest status per service, from polling or pushed webhook events
+status_lock = threading.Lock() # Guards current_statuses and pending_reconcile
+pending_reconcile = set() # Services a webhook event couldn't apply incrementally; poll them next cycle
+refresh_event = threading.Event() # Wakes the main loop (webhook events, refresh and shutdown requests)
+poll_now_event = threading.Event() # Set by SIGHUP: poll everything now
+shutdown_event = threading.Event() # Set by SIGTERM/SIGINT
+shutdown_deadline = None # time.time() by which shutdown must have finished
+transport_state = None # Active record/replay state (see start_transport)
+diagnostics_requested = threading.Event() # Set by SIGUSR1 or the admin endpoint
+diagnostics_state = {"profiler": None, "cycles_left": 0, "started_tracemalloc": False}
+
+RESPONSE_CACHE_MAX_ENTRIES = 256
+sabnzbd_history_state = {} # base_url -> {"last_update": int, "jobs": {nzo_id: (completed, status)}}
+plex_library_state = {} # base_url -> {section key: {"title", "marker", "count", "counted_at", "history"}}
+plex_library_stale = set() # Section keys (None for all) a Plex webhook marked for a recount
+alert_states = {} # rule key -> {"pending_since", "active", "notified", "sending", "last_notified"}
+previous_service_states = {} # service -> status string from the previous cycle
+alert_lock = threading.Lock() # Guards alert_states against the alert delivery thread
+
+SABNZBD_HISTORY_WINDOW = 3600 # Seconds of history counted as "last hour"
+PLEX_LIBRARY_GROWTH_WINDOW = 86400 # Seconds over which library growth is reported
+
+# --- Logging Pipeline ---
+class RepeatSuppressFilter(logging.Filter):
+    """Collapses identical log messages repeated within a time window.
+
+    The first occurrence is logged; repeats within `window` seconds are dropped
+    (tracebacks included) and counted. The next occurrence after the window is
+    logged with the count appended, e.g. "... (x240 in last 3600s)".
+    """
+
+    MAX_TRACKED = 1000
+
+    def __init__(self, window=3600, level=logging.WARNING):
+        super().__init__()
+        self.window = window
+        self.level = level
+        self.seen = {} # (levelno, message) -> [window_start, occurrences]
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+        key = (record.levelno, record.getMessage())
+        entry = self.seen.get(key)
+        if entry is not None and record.created - entry[0] < self.window:
+            entry[1] += 1
+            return False
+
+        if entry is not None and entry[1] > 1:
+            record.msg = f"{key[1]} (x{entry[1]} in last {self.window:.0f}s)"
+            record.args = None
+        if len(self.seen) >= self.MAX_TRACKED:
+            # Forget messages whose window has already closed to keep memory bounded
+            self.seen = {k: v for k, v in self.seen.items() if record.created - v[0] < self.window}
+        self.seen[key] = [record.created, 1]
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry)
+
+
+class _LogQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread for in-process queues."""
+
+    def __init__(self, log_queue, in_process):
+        super().__init__(log_queue)
+        self.in_process = in_process
+
+    def prepare(self, record):
+        if self.in_process:
+            # The listener runs in this process, so the record can be handed over as is
+            return record
+        return super().prepare(record) # Records crossing processes must be pickle-safe
+
+
+def setup_logging(config):
+    """Replaces the bootstrap logging handlers with the configured pipeline.
+
+    Log files rotate by size (or by time with `rotate_when`), repeated warnings
+    and errors are collapsed, and with `queue` enabled all log I/O happens on a
+    background listener thread instead of the polling path.
+    """
+    global log_listener
+    log_config = config.get('logging', {})
+
+    if log_config.get('rotate_when'):
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=log_config['rotate_when'], backupCount=log_config.get('backup_count', 5))
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=log_config.get('max_bytes', 10 * 1024 * 1024), backupCount=log_config.get('backup_count', 5))
+    output_handlers = [file_handler, logging.StreamHandler()]
+    if log_config.get('format') == 'json':
+        formatter = JsonLogFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    for handler in output_handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(log_config.get('level', 'INFO'))
+
+    suppress_window = log_config.get('suppress_repeats_seconds', 3600)
+    suppress_filter = RepeatSuppressFilter(suppress_window) if suppress_window else None
+
+    if log_config.get('queue', True):
+        # Worker processes (see ShardedPoller) log through the same queue, so it must
+        # be a multiprocessing queue when they are in use.
+        in_process = config.get('workers', 0) <= 0
+        log_queue = queue.SimpleQueue() if in_process else multiprocessing.Queue()
+        queue_handler = _LogQueueHandler(log_queue, in_process)
+        if suppress_filter:
+            queue_handler.addFilter(suppress_filter)
+        root.addHandler(queue_handler)
+        log_listener = logging.handlers.QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+        log_listener.start()
+    else:
+        for handler in output_handlers:
+            if suppress_filter:
+                handler.addFilter(suppress_filter)
+            root.addHandler(handler)
+
+def stop_logging():
+    """Flushes and stops the background log listener, if any.
+
+    The listener's handlers are attached to the root logger directly afterwards so
+    messages logged during shutdown are still written.
+    """
+    global log_listener
+    if log_listener:
+        log_listener.stop()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                root.removeHandler(handler)
+                for log_filter in handler.filters:
+                    for output_handler in log_listener.handlers:
+                        output_handler.addFilter(log_filter)
+        for handler in log_listener.handlers:
+            root.addHandler(handler)
+        log_listener = None
+
+
+# --- HTTP Transport ---
+def get_http_session():
+    """Returns the shared session so probes reuse pooled connections."""
+    global http_session
+    if http_session is None:
+        http_session = requests.Session()
+    return http_session
+
+def configure_runtime(config):
+    """Applies the module-wide `http_cache`, `pipeline` and `timeouts` settings from config.json."""
+    http_cache_config.update(config.get('http_cache', {}))
+    pipeline_config.update(config.get('pipeline', {}))
+    timeout_config["cycle_budget_seconds"] = config.get('update_interval_seconds', 60) * 0.75
+    timeout_config.update(config.get('timeouts', {}))
+    service_timeout_overrides.clear()
+    for service, service_config in (config.get('services') or {}).items():
+        timeout = (service_config or {}).get('timeout')
+        if isinstance(timeout, (int, float)):
+            service_timeout_overrides[service] = (timeout, timeout)
+        elif isinstance(timeout, (list, tuple)) and len(timeout) == 2:
+            service_timeout_overrides[service] = tuple(timeout)
+
+def http_get_json(url, params=None, headers=None, timeout=None, ttl=0, cache=True, service=None):
+    """GETs a JSON document through the shared session with a conditional-request cache.
+
+    Responses carrying an ETag or Last-Modified header are stored with their parsed
+    body; the next request sends If-None-Match/If-Modified-Since and a 304 returns the
+    stored object without downloading or parsing it again. Endpoints without
+    validators can be given a `ttl` during which the stored object is reused without
+    a request at all. With a `service`, requests use its adaptive timeout (see
+    ServiceSession). Raises the same requests exceptions as a plain GET.
+    """
+    session = ServiceSession(service) if service else get_http_session()
+    if timeout is None and not service:
+        timeout = 10
+    if not cache or not http_cache_config.get('enabled', True):
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    key = (url, tuple(sorted((params or {}).items())))
+    entry = response_cache.get(key)
+    now = time.time()
+    if entry and ttl and now - entry["fetched_at"] < ttl:
+        return entry["data"]
+
+    request_headers = dict(headers or {})
+    if entry and entry["etag"]:
+        request_headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        request_headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = session.get(url, params=params, headers=request_headers, timeout=timeout)
+    if response.status_code == 304 and entry:
+        entry["fetched_at"] = now
+        logging.debug(f"Not modified, reusing cached response for {url}")
+        return entry["data"]
+    response.raise_for_status()
+    data = response.json()
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified or ttl:
+        if key not in response_cache and len(response_cache) >= RESPONSE_CACHE_MAX_ENTRIES:
+            response_cache.pop(next(iter(response_cache))) # Evict the oldest entry
+        response_cache[key] = {"etag": etag, "last_modified": last_modified, "data": data, "fetched_at": now}
+    return data
+
+
+# --- Adaptive Timeouts ---
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+def service_timeout(service):
+    """Returns the (connect, read) timeout for a service's next request.
+
+    Derived from the service's recent response times: p99 times `multiplier`,
+    kept between the configured floors and caps. Until `min_samples` responses
+    have been seen the caps are used, so a slow link isn't cut off while it is
+    being learned. Each consecutive timeout doubles the learned values (up to
+    the caps) until the service answers again. The read timeout is also limited
+    by what is left of the cycle budget.
+    """
+    config = timeout_config
+    if service in service_timeout_overrides:
+        connect, read = service_timeout_overrides[service]
+    else:
+        history = latency_history.get(service)
+        if not config.get('adaptive', True) or not history or len(history) < config.get('min_samples', 10):
+            connect, read = config["connect_cap"], config["read_cap"]
+        else:
+            ordered = sorted(history)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            backoff = 2 ** min(timeout_strikes.get(service, 0), 8)
+            connect = _clamp(p99 * config["multiplier"] * backoff, config["connect_floor"], config["connect_cap"])
+            read = _clamp(p99 * config["multiplier"] * backoff, config["read_floor"], config["read_cap"])
+    if cycle_deadline is not None:
+        remaining = cycle_deadline - time.perf_counter()
+        read = min(read, max(remaining, config["read_floor"]))
+        connect = min(connect, read)
+    return (round(connect, 3), round(read, 3))
+
+def record_latency(service, seconds):
+    """Adds a response time to a service's latency history."""
+    history = latency_history.get(service)
+    if history is None:
+        history = latency_history[service] = collections.deque(maxlen=timeout_config.get('history_size', 100))
+    history.append(seconds)
+    timeout_strikes.pop(service, None)
+
+def record_timeout(service):
+    """Notes a timed-out request so the service's next timeout backs off."""
+    timeout_strikes[service] = timeout_strikes.get(service, 0) + 1
+    logging.warning(f"{service.capitalize()} request timed out; next timeout {service_timeout(service)}s.")
+
+def _latency_hook(service):
+    """Returns a requests response hook that records response times for a service."""
+    def hook(response, *args, **kwargs):
+        if isinstance(getattr(response, 'elapsed', None), datetime.timedelta):
+            record_latency(service, response.elapsed.total_seconds())
+    return hook
+
+
+class ServiceSession:
+    """One service's view of the shared HTTP session.
+
+    Applies the service's adaptive (connect, read) timeout to every request and
+    feeds response times and timeouts back into its latency history. It has the
+    get/post/put/delete methods pyarr and plexapi call on their sessions.
+    """
+
+    def __init__(self, service, verify=True):
+        self.service = service
+        self.verify = verify
+
+    def _send(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = service_timeout(self.service)
+        if not self.verify:
+            kwargs.setdefault('verify', False)
+        try:
+            response = getattr(get_http_session(), method)(url, **kwargs)
+        except requests.exceptions.Timeout:
+            record_timeout(self.service)
+            raise
+        _latency_hook(self.service)(response)
+        return response
+
+    def get(self, url, **kwargs):
+        return self._send('get', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._send('post', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self._send('put', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._send('delete', url, **kwargs)
+
+
+# --- Record/Replay Transport ---
+# Query parameters and path segments holding credentials are redacted in captures,
+# and the same normalization is applied when replaying so captures work with any keys.
+REDACTED_QUERY_PARAMS = {'apikey', 'api_key', 'x-plex-token', 'token'}
+DISCORD_TOKEN_PATTERN = re.compile(r'(/api/webhooks/\d+/)[^/]+')
+TRANSPORT_ERRORS = {
+    "ConnectTimeout": requests.exceptions.ConnectTimeout,
+    "ReadTimeout": requests.exceptions.ReadTimeout,
+    "Timeout": requests.exceptions.Timeout,
+}
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Location')
+CAPTURE_FLUSH_SECONDS = 5
+
+def _normalize_url(url):
+    """Returns the URL with credentials redacted and query parameters sorted."""
+    parts = urllib.parse.urlsplit(url)
+    query = sorted(
+        (key, 'REDACTED' if key.lower() in REDACTED_QUERY_PARAMS else value)
+        for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    )
+    path = DISCORD_TOKEN_PATTERN.sub(r'\1REDACTED', parts.path)
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, path, urllib.parse.urlencode(query), ''))
+
+def _recording_send(adapter, request, **kwargs):
+    """HTTPAdapter.send replacement that captures every request and response."""
+    state = transport_state
+    start = time.perf_counter()
+    entry = {"t": round(time.time() - state["start"], 3), "method": request.method, "url": _normalize_url(request.url)}
+    try:
+        response = state["original_send"](adapter, request, **kwargs)
+        body = response.content # Reads the whole body so it can be captured
+    except requests.exceptions.RequestException as e:
+        entry.update({"elapsed": round(time.perf_counter() - start, 4), "error": type(e).__name__})
+        with state["lock"]:
+            state["file"].write(json.dumps(entry) + "\n")
+        raise
+    entry.update({
+        "elapsed": round(time.perf_counter() - start, 4),
+        "status": response.status_code,
+        "reason": response.reason,
+        "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+        "body": base64.b64encode(body).decode('ascii'),
+    })
+    with state["lock"]:
+        state["file"].write(json.dumps(entry, separators=(',', ':')) + "\n")
+        state["count"] += 1
+        # Sync-flush regularly: the file is never closed if the process is killed
+        # (or the shutdown watchdog exits), and a replay can still read up to here
+        if time.time() - state["flushed_at"] >= CAPTURE_FLUSH_SECONDS:
+            state["file"].flush()
+            state["flushed_at"] = time.time()
+    return response
+
+def _replaying_send(adapter, request, **kwargs):
+    """HTTPAdapter.send replacement that serves responses from a capture file.
+
+    Recordings for the same request are served in their original order and then
+    wrap around, so a capture of a few cycles can drive a long replay. When there is
+    no exact match, a recording of the same path with different query parameters
+    is used instead.
+    """
+    state = transport_state
+    url = _normalize_url(request.url)
+    with state["lock"]:
+        recordings = state["entries"].get((request.method, url))
+        if not recordings:
+            recordings = state["by_path"].get((request.method, url.split('?')[0]))
+        if not recordings:
+            state["missed"] += 1
+            entry = None
+        else:
+            entry = recordings[0]
+            recordings.rotate(-1)
+            state["count"] += 1
+    if entry is None:
+        logging.warning(f"Replay: no recording for {request.method} {url}")
+        raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {url}", request=request)
+
+    if state["latency_scale"]:
+        time.sleep(entry["elapsed"] * state["latency_scale"])
+    if "error" in entry:
+        raise TRANSPORT_ERRORS.get(entry["error"], requests.exceptions.ConnectionError)(f"Replayed {entry['error']}", request=request)
+
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.reason = entry.get("reason")
+    response.headers = requests.structures.CaseInsensitiveDict(entry.get("headers", {}))
+    response._content = base64.b64decode(entry.get("body", ""))
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.elapsed = datetime.timedelta(seconds=entry["elapsed"])
+    return response
+
+def start_transport(transport_config):
+    """Routes all HTTP traffic through the recorder or the replayer.
+
+    Patching requests' HTTPAdapter covers every library the probes use (plexapi,
+    pyarr, qbittorrent-api and the shared session) as well as Discord delivery.
+    """
+    global transport_state
+    mode = transport_config.get('mode')
+    if not mode:
+        return
+    import gzip
+    path = transport_config.get('path', 'plex_monitor_capture.ndjson.gz')
+    state = {"mode": mode, "path": path, "lock": threading.Lock(), "start": time.time(), "count": 0,
+             "missed": 0, "original_send": requests.adapters.HTTPAdapter.send}
+
+    if mode == "record":
+        state["file"] = gzip.open(path, 'at')
+        state["flushed_at"] = time.time()
+        requests.adapters.HTTPAdapter.send = _recording_send
+    elif mode == "replay":
+        entries = collections.defaultdict(collections.deque)
+        by_path = collections.defaultdict(collections.deque)
+        loaded = 0
+        try:
+            with gzip.open(path, 'rt') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        logging.warning(f"Skipping an unreadable line in capture file '{path}'.")
+                        continue
+                    entries[(entry["method"], entry["url"])].append(entry)
+                    by_path[(entry["method"], entry["url"].split('?')[0])].append(entry)
+                    loaded += 1
+        except EOFError:
+            # The recorder was killed before closing the file; keep what was flushed
+            logging.warning(f"Capture file '{path}' is truncated; replaying the {loaded} responses before the cut.")
+        except OSError as e:
+            logging.error(f"Could not load capture file '{path}' for replay: {e}")
+            return
+        if not loaded:
+            logging.error(f"Capture file '{path}' has no recorded responses to replay.")
+            return
+        state.update({"entries": entries, "by_path": by_path, "latency_scale": transport_config.get('latency_scale', 1.0)})
+        requests.adapters.HTTPAdapter.send = _replaying_send
+    else:
+        logging.error(f"Unknown transport mode '{mode}'; expected 'record' or 'replay'.")
+        return
+    transport_state = state
+    logging.info(f"Transport {mode} mode active using '{path}'.")
+
+def stop_transport():
+    """Restores the normal transport and closes the capture file."""
+    global transport_state
+    state = transport_state
+    if not state:
+        return
+    requests.adapters.HTTPAdapter.send = state["original_send"]
+    if state["mode"] == "record":
+        state["file"].close()
+        logging.info(f"Recorded {state['count']} responses to '{state['path']}'.")
+    else:
+        logging.info(f"Replayed {state['count']} responses ({state['missed']} requests had no recording).")
+    transport_state = None
+
+
+# --- Status Records ---
+class StatusRecord:
+    """Read-only mapping access for the namedtuple status records below.
+
+    Every service reports a fixed set of fields. Fields a probe didn't fill in
+    (e.g. `queue_items` while the pipeline view is off) are None, and `get()`
+    treats them as missing, the same way it would for a dict.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self._fields else None
+        return default if value is None else value
+
+    def keys(self):
+        return self._fields
+
+def _status_record(name, fields):
+    base = collections.namedtuple(name, fields, defaults=(None,) * len(fields.split()))
+    return type(name, (StatusRecord, base), {"__slots__": (), "__module__": __name__})
+
+PlexStatus = _status_record("PlexStatus", "status sessions library error")
+ArrStatus = _status_record("ArrStatus", "status queue_count health queue_items error")
+SabnzbdStatus = _status_record("SabnzbdStatus", "status speed speed_kbps queue_size jobs slots pipeline_slots completed_last_hour failed_last_hour error")
+QbittorrentStatus = _status_record("QbittorrentStatus", "status download_speed upload_speed download_bytes upload_bytes active_torrents torrent_delta error")
+TautulliStatus = _status_record("TautulliStatus", "status stream_count total_bandwidth bandwidth_kbps error")
+OverseerrStatus = _status_record("OverseerrStatus", "status pending_requests error")
+PipelineStatus = _status_record("PipelineStatus", "status items stalled stalled_items error")
+
+STATUS_RECORDS = {
+    "plex": PlexStatus,
+    "radarr": ArrStatus,
+    "sonarr": ArrStatus,
+    "sabnzbd": SabnzbdStatus,
+    "qbittorrent": QbittorrentStatus,
+    "tautulli": TautulliStatus,
+    "overseerr": OverseerrStatus,
+    "pipeline": PipelineStatus,
+}
 
 # --- Helper Functions ---
+def load_service_library(library):
+    """Imports a service client library on first use and binds its names in this module.
+
+    Names that are already bound (e.g. replaced in tests) are left alone.
+    """
+    names = SERVICE_LIBRARIES[library]
+    missing = [name for name in names if globals()[name] is None]
+    if not missing:
+        return
+    start = time.perf_counter()
+    for name in missing:
+        module_name, attribute = names[name]
+        module = importlib.import_module(module_name)
+        globals()[name] = getattr(module, attribute) if attribute else module
+    library_load_times[library] = library_load_times.get(library, 0) + time.perf_counter() - start
+    logging.info(f"Loaded {library} in {library_load_times[library] * 1000:.0f} ms")
+
+def log_startup_report():
+    """Logs how long it took to get the first update out and what it cost in memory."""
+    elapsed = time.perf_counter() - STARTUP_TIME
+    libraries = ", ".join(f"{name} ({seconds * 1000:.0f} ms)" for name, seconds in library_load_times.items()) or "none"
+    report = f"Startup report: first update published {elapsed:.2f}s after start. Libraries loaded: {libraries}."
+    if resource:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+        max_rss_mb = max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+        report += f" Peak RSS: {max_rss_mb:.1f} MB."
+    logging.info(report)
+
 def load_config():
     """Loads configuration from config.json."""
     if not os.path.exists(CONFIG_FILE):
@@ -52,155 +679,340 @@ def get_plex_status(config):
     """Fetches status from Plex using plexapi."""
     if not config:
         logging.warning("Plex configuration missing in config.json")
-        return {"status": "Offline", "sessions": "N/A", "error": "Config missing"}
+        return PlexStatus(status="Offline", sessions="N/A", error="Config missing")
 
     baseurl = config.get('url')
     token = config.get('token')
 
     if not baseurl or not token or 'YOUR_PLEX_' in baseurl or 'YOUR_PLEX_' in token:
         logging.warning("Plex URL or Token is missing or not configured in config.json")
-        return {"status": "Offline", "sessions": "N/A", "error": "URL/Token missing"}
+        return PlexStatus(status="Offline", sessions="N/A", error="URL/Token missing")
 
+    load_service_library("plexapi")
     logging.info(f"Attempting to connect to Plex: {baseurl}")
+    # Certificates aren't verified, as Plex commonly uses its own plex.direct certificates
+    session = ServiceSession("plex", verify=False)
     try:
-        # Set a timeout for the connection attempt
-        session = requests.Session()
-        session.verify = False # Consider security implications if not using HTTPS or valid certs
-        plex = PlexServer(baseurl, token, session=session, timeout=10)
-        sessions = plex.sessions()
-        session_count = len(sessions)
+        plex = PlexServer(baseurl, token, session=session, timeout=service_timeout("plex"))
+        # Only the count is needed, so read the container size instead of building
+        # a PlexSession object (with its media/user/player graph) for every stream
+        container = plex.query('/status/sessions')
+        size = container.attrib.get('size')
+        session_count = int(size) if size is not None else len(container)
+
+        library = None
+        if config.get('library_stats', False):
+            try:
+                library = get_plex_library_stats(plex, baseurl, config.get('library_stats_ttl_seconds', 21600))
+            except Exception as e:
+                # Library stats are supplementary; keep the session status if they fail
+                logging.warning(f"Plex library stats check failed: {e}")
+
         logging.info(f"Plex connection successful. Active sessions: {session_count}")
-        return {"status": "Online", "sessions": session_count, "error": None}
+        return PlexStatus(status="Online", sessions=session_count, library=library, error=None)
     except Unauthorized:
         logging.error("Plex connection failed: Unauthorized (Invalid Token?).")
-        return {"status": "Error", "sessions": "N/A", "error": "Unauthorized"}
+        return PlexStatus(status="Error", sessions="N/A", error="Unauthorized")
     except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
         logging.error(f"Plex connection failed: Could not connect to {baseurl}.")
-        return {"status": "Offline", "sessions": "N/A", "error": "Connection failed"}
+        return PlexStatus(status="Offline", sessions="N/A", error="Connection failed")
     except NotFound:
          logging.error(f"Plex connection failed: Server not found at {baseurl} (404).")
-         return {"status": "Offline", "sessions": "N/A", "error": "Not Found (404)"}
+         return PlexStatus(status="Offline", sessions="N/A", error="Not Found (404)")
     except Exception as e:
         logging.exception(f"An unexpected error occurred connecting to Plex: {e}")
-        return {"status": "Error", "sessions": "N/A", "error": f"Unexpected: {type(e).__name__}"}
+        return PlexStatus(status="Error", sessions="N/A", error=f"Unexpected: {type(e).__name__}")
+
+def get_plex_library_stats(plex, base_url, ttl, now=None):
+    """Returns a (title, item count, growth) tuple for each Plex library section.
+
+    Counts come from container-size-0 queries, which return only the section's
+    totalSize header rather than its items. A section is only recounted when its
+    updatedAt/scannedAt changed (or Plex reported new media via webhook), or
+    after `ttl` seconds; otherwise the cached count is reused, so an unchanged
+    library costs one small request per cycle. Growth is the change in count
+    over the last 24 hours, from the counts seen since then.
+    """
+    global plex_library_stale
+    if now is None:
+        now = time.time()
+    sections = plex_library_state.setdefault(base_url, {})
+    with status_lock:
+        stale, plex_library_stale = plex_library_stale, set()
+
+    seen = set()
+    for directory in plex.query('/library/sections').findall('Directory'):
+        key = directory.attrib.get('key')
+        seen.add(key)
+        marker = (directory.attrib.get('updatedAt'), directory.attrib.get('scannedAt'))
+        section = sections.get(key)
+        if section is None or section["marker"] != marker or key in stale or None in stale or now - section["counted_at"] >= ttl:
+            container = plex.query(f'/library/sections/{key}/all', params={'X-Plex-Container-Start': 0, 'X-Plex-Container-Size': 0})
+            count = int(container.attrib.get('totalSize', container.attrib.get('size', 0)))
+            if section is None:
+                section = sections[key] = {"history": collections.deque([(now, count)])}
+            elif count != section["count"]:
+                logging.info(f"Plex library '{directory.attrib.get('title')}' now has {count} items (was {section['count']}).")
+                section["history"].append((now, count))
+            section.update(title=directory.attrib.get('title', key), marker=marker, count=count, counted_at=now)
+        # Keep the counts of the last 24 hours, plus the last one from before that as the baseline
+        history = section["history"]
+        while len(history) > 1 and history[1][0] <= now - PLEX_LIBRARY_GROWTH_WINDOW:
+            history.popleft()
+
+    for key in [key for key in sections if key not in seen]:
+        del sections[key]
+    return tuple((section["title"], section["count"], section["count"] - section["history"][0][1]) for section in sections.values())
+
+def _arr_health_note(service, host_url, api_key):
+    """Returns the open health issues of a Radarr/Sonarr instance as one line, or None.
+
+    Read on every poll, so a note pushed by a Health webhook survives reconcile
+    polls while the issue is still open and clears once it is fixed.
+    """
+    try:
+        checks = http_get_json(f"{host_url.rstrip('/')}/api/v3/health", headers={"X-Api-Key": api_key}, service=service)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logging.warning(f"{service.capitalize()} health check failed: {e}")
+        return None
+    issues = [check for check in checks if isinstance(check, dict) and check.get('type') in ('error', 'warning') and check.get('message')]
+    if not issues:
+        return None
+    issues.sort(key=lambda check: check['type'] != 'error')
+    return issues[0]['message'] + (f" (+{len(issues) - 1} more)" if len(issues) > 1 else "")
+
+def _arr_queue_items(records):
+    """Reduces *arr queue records to (download_id, title, size, sizeleft) tuples for the pipeline view."""
+    return [
+        (record['downloadId'].upper(), record.get('title', ''), record.get('size', 0), record.get('sizeleft', 0))
+        for record in records if record.get('downloadId')
+    ]
 
 def get_radarr_status(config):
     """Fetches status from Radarr using pyarr."""
     if not config:
         logging.warning("Radarr configuration missing in config.json")
-        return {"status": "Offline", "queue_count": "N/A", "error": "Config missing"}
+        return ArrStatus(status="Offline", queue_count="N/A", error="Config missing")
 
     host_url = config.get('url')
     api_key = config.get('api_key')
 
     if not host_url or not api_key or 'YOUR_RADARR_' in host_url or 'YOUR_RADARR_' in api_key:
         logging.warning("Radarr URL or API Key is missing or not configured in config.json")
-        return {"status": "Offline", "queue_count": "N/A", "error": "URL/API Key missing"}
+        return ArrStatus(status="Offline", queue_count="N/A", error="URL/API Key missing")
 
+    load_service_library("pyarr")
     logging.info(f"Attempting to connect to Radarr: {host_url}")
     try:
-        radarr = RadarrAPI(host_url, api_key, timeout=10)
-        # Verify connection by getting system status (optional but good)
-        radarr.get_system_status()
-        # Get queue information
-        queue = radarr.get_queue()
-        queue_count = len(queue.get('records', [])) if isinstance(queue, dict) else 0 # pyarr v3+ returns dict
-        # Alternative for older pyarr versions if needed:
-        # queue = radarr.get_queue()
-        # queue_count = len(queue) if isinstance(queue, list) else 0
+        radarr = RadarrAPI(host_url, api_key)
+        radarr.session = ServiceSession("radarr")
+        # Verify connection by getting system status (optional but good). The result
+        # rarely changes, so it is served from the response cache within the TTL.
+        http_get_json(f"{host_url.rstrip('/')}/api/v3/system/status", headers={"X-Api-Key": api_key},
+                      ttl=http_cache_config.get('ttl_seconds', 300), service="radarr")
+        # Get queue information. Only the first page of records is returned, so the
+        # count comes from totalRecords; records are only needed for the pipeline view.
+        if pipeline_config.get('enabled'):
+            queue = radarr.get_queue(page_size=pipeline_config.get('max_items', 100))
+        else:
+            queue = radarr.get_queue()
+        if not isinstance(queue, dict): # pyarr v3+ returns dict
+            queue = {}
+        records = queue.get('records', [])
+        queue_count = queue.get('totalRecords', len(records))
+
+        queue_items = _arr_queue_items(records) if pipeline_config.get('enabled') else None
+        health = _arr_health_note("radarr", host_url, api_key)
 
         logging.info(f"Radarr connection successful. Queue count: {queue_count}")
-        return {"status": "Online", "queue_count": queue_count, "error": None}
+        return ArrStatus(status="Online", queue_count=queue_count, health=health, queue_items=queue_items, error=None)
     except ReqConnectionError:
         logging.error(f"Radarr connection failed: Could not connect to {host_url}.")
-        return {"status": "Offline", "queue_count": "N/A", "error": "Connection failed"}
+        return ArrStatus(status="Offline", queue_count="N/A", error="Connection failed")
     except HTTPError as e:
         if e.response.status_code == 401:
              logging.error("Radarr connection failed: Unauthorized (Invalid API Key?).")
-             return {"status": "Error", "queue_count": "N/A", "error": "Unauthorized"}
+             return ArrStatus(status="Error", queue_count="N/A", error="Unauthorized")
         else:
              logging.error(f"Radarr connection failed: HTTP Error {e.response.status_code}")
-             return {"status": "Error", "queue_count": "N/A", "error": f"HTTP {e.response.status_code}"}
+             return ArrStatus(status="Error", queue_count="N/A", error=f"HTTP {e.response.status_code}")
     except Exception as e:
+        # pyarr re-raises request timeouts as its own connection error
+        if isinstance(e, requests.exceptions.Timeout) or isinstance(e.__cause__, requests.exceptions.Timeout):
+            logging.error(f"Radarr connection failed: Timeout connecting to {host_url}.")
+            return ArrStatus(status="Offline", queue_count="N/A", error="Timeout")
         logging.exception(f"An unexpected error occurred connecting to Radarr: {e}")
-        return {"status": "Error", "queue_count": "N/A", "error": f"Unexpected: {type(e).__name__}"}
+        return ArrStatus(status="Error", queue_count="N/A", error=f"Unexpected: {type(e).__name__}")
 
 def get_sonarr_status(config):
     """Fetches status from Sonarr using pyarr."""
     if not config:
         logging.warning("Sonarr configuration missing in config.json")
-        return {"status": "Offline", "queue_count": "N/A", "error": "Config missing"}
+        return ArrStatus(status="Offline", queue_count="N/A", error="Config missing")
 
     host_url = config.get('url')
     api_key = config.get('api_key')
 
     if not host_url or not api_key or 'YOUR_SONARR_' in host_url or 'YOUR_SONARR_' in api_key:
         logging.warning("Sonarr URL or API Key is missing or not configured in config.json")
-        return {"status": "Offline", "queue_count": "N/A", "error": "URL/API Key missing"}
+        return ArrStatus(status="Offline", queue_count="N/A", error="URL/API Key missing")
 
+    load_service_library("pyarr")
     logging.info(f"Attempting to connect to Sonarr: {host_url}")
     try:
-        sonarr = SonarrAPI(host_url, api_key, timeout=10)
-        # Verify connection by getting system status (optional but good)
-        sonarr.get_system_status()
-        # Get queue information
-        queue = sonarr.get_queue()
-        queue_count = len(queue.get('records', [])) if isinstance(queue, dict) else 0 # pyarr v3+ returns dict
-        # Alternative for older pyarr versions if needed:
-        # queue = sonarr.get_queue()
-        # queue_count = len(queue) if isinstance(queue, list) else 0
+        sonarr = SonarrAPI(host_url, api_key)
+        sonarr.session = ServiceSession("sonarr")
+        # Verify connection by getting system status (optional but good). The result
+        # rarely changes, so it is served from the response cache within the TTL.
+        http_get_json(f"{host_url.rstrip('/')}/api/v3/system/status", headers={"X-Api-Key": api_key},
+                      ttl=http_cache_config.get('ttl_seconds', 300), service="sonarr")
+        # Get queue information. Only the first page of records is returned, so the
+        # count comes from totalRecords; records are only needed for the pipeline view.
+        if pipeline_config.get('enabled'):
+            queue = sonarr.get_queue(page_size=pipeline_config.get('max_items', 100))
+        else:
+            queue = sonarr.get_queue()
+        if not isinstance(queue, dict): # pyarr v3+ returns dict
+            queue = {}
+        records = queue.get('records', [])
+        queue_count = queue.get('totalRecords', len(records))
+
+        queue_items = _arr_queue_items(records) if pipeline_config.get('enabled') else None
+        health = _arr_health_note("sonarr", host_url, api_key)
 
         logging.info(f"Sonarr connection successful. Queue count: {queue_count}")
-        return {"status": "Online", "queue_count": queue_count, "error": None}
+        return ArrStatus(status="Online", queue_count=queue_count, health=health, queue_items=queue_items, error=None)
     except ReqConnectionError:
         logging.error(f"Sonarr connection failed: Could not connect to {host_url}.")
-        return {"status": "Offline", "queue_count": "N/A", "error": "Connection failed"}
+        return ArrStatus(status="Offline", queue_count="N/A", error="Connection failed")
     except HTTPError as e:
         if e.response.status_code == 401:
              logging.error("Sonarr connection failed: Unauthorized (Invalid API Key?).")
-             return {"status": "Error", "queue_count": "N/A", "error": "Unauthorized"}
+             return ArrStatus(status="Error", queue_count="N/A", error="Unauthorized")
         else:
              logging.error(f"Sonarr connection failed: HTTP Error {e.response.status_code}")
-             return {"status": "Error", "queue_count": "N/A", "error": f"HTTP {e.response.status_code}"}
+             return ArrStatus(status="Error", queue_count="N/A", error=f"HTTP {e.response.status_code}")
     except Exception as e:
+        # pyarr re-raises request timeouts as its own connection error
+        if isinstance(e, requests.exceptions.Timeout) or isinstance(e.__cause__, requests.exceptions.Timeout):
+            logging.error(f"Sonarr connection failed: Timeout connecting to {host_url}.")
+            return ArrStatus(status="Offline", queue_count="N/A", error="Timeout")
         logging.exception(f"An unexpected error occurred connecting to Sonarr: {e}")
-        return {"status": "Error", "queue_count": "N/A", "error": f"Unexpected: {type(e).__name__}"}
+        return ArrStatus(status="Error", queue_count="N/A", error=f"Unexpected: {type(e).__name__}")
+
+def _format_sabnzbd_slot(slot):
+    """Reduces a Sabnzbd queue slot to the handful of fields the monitor uses."""
+    return {
+        "nzo_id": slot.get('nzo_id'),
+        "filename": slot.get('filename', ''),
+        "percentage": slot.get('percentage', '0'),
+        "timeleft": slot.get('timeleft', ''),
+        "status": slot.get('status', ''),
+    }
+
+def _parse_timeleft(timeleft):
+    """Converts Sabnzbd's "h:mm:ss" (or "d:hh:mm:ss") time left into seconds."""
+    seconds = 0
+    try:
+        for part in str(timeleft).split(':'):
+            seconds = seconds * 60 + int(part)
+    except ValueError:
+        return None
+    return seconds
+
+def _sabnzbd_pipeline_slots(slots, speed_bytes):
+    """Indexes queue slots by nzo_id for the pipeline view.
+
+    Sabnzbd only reports an overall speed, which is attributed to the slot that is
+    actually downloading (the first one with status Downloading).
+    """
+    indexed = {}
+    speed_assigned = False
+    for slot in slots:
+        downloading = slot.get('status') == "Downloading"
+        speed = speed_bytes if downloading and not speed_assigned else 0
+        speed_assigned = speed_assigned or downloading
+        indexed[slot.get('nzo_id', '').upper()] = (
+            slot.get('filename', ''), float(slot.get('percentage', 0)), speed,
+            _parse_timeleft(slot.get('timeleft', '')), downloading)
+    return indexed
+
+def get_sabnzbd_history(api_url, api_key, base_url, limit=20):
+    """Incrementally tracks Sabnzbd history and returns counts for the last hour.
+
+    Uses `last_history_update` so Sabnzbd only sends history slots when something
+    changed since the previous poll. Returns a (completed, failed) tuple.
+    """
+    state = sabnzbd_history_state.setdefault(base_url, {"last_update": 0, "jobs": {}})
+    params = {
+        "mode": "history",
+        "output": "json",
+        "apikey": api_key,
+        "limit": limit,
+        "last_history_update": state["last_update"],
+    }
+    # last_history_update changes with every new job, so caching these responses would only churn the cache
+    history = http_get_json(api_url, params=params, cache=False, service="sabnzbd").get('history') or {}
+
+    cutoff = time.time() - SABNZBD_HISTORY_WINDOW
+    jobs = state["jobs"]
+    for slot in history.get('slots') or []:
+        completed = int(slot.get('completed') or 0)
+        nzo_id = slot.get('nzo_id')
+        if completed < cutoff or not nzo_id:
+            continue
+        if nzo_id not in jobs and slot.get('status') == "Failed":
+            logging.warning(f"Sabnzbd job failed: {slot.get('name', nzo_id)} ({slot.get('fail_message', 'no reason given')})")
+        jobs[nzo_id] = (completed, slot.get('status'))
+    state["last_update"] = history.get('last_history_update', state["last_update"])
+
+    # Drop jobs that have aged out of the window so the state stays bounded
+    for nzo_id in [k for k, (completed, _) in jobs.items() if completed < cutoff]:
+        del jobs[nzo_id]
+
+    completed_count = sum(1 for _, status in jobs.values() if status == "Completed")
+    failed_count = sum(1 for _, status in jobs.values() if status == "Failed")
+    return completed_count, failed_count
 
 def get_sabnzbd_status(config):
     """Fetches status from Sabnzbd using its JSON API."""
     if not config:
         logging.warning("Sabnzbd configuration missing in config.json")
-        return {"status": "Offline", "speed": "N/A", "queue_size": "N/A", "error": "Config missing"}
+        return SabnzbdStatus(status="Offline", speed="N/A", queue_size="N/A", error="Config missing")
 
     base_url = config.get('url')
     api_key = config.get('api_key')
 
     if not base_url or not api_key or 'YOUR_SABNZBD_' in base_url or 'YOUR_SABNZBD_' in api_key:
         logging.warning("Sabnzbd URL or API Key is missing or not configured in config.json")
-        return {"status": "Offline", "speed": "N/A", "queue_size": "N/A", "error": "URL/API Key missing"}
+        return SabnzbdStatus(status="Offline", speed="N/A", queue_size="N/A", error="URL/API Key missing")
 
     # Ensure base_url doesn't end with a slash for proper joining
     if base_url.endswith('/'):
         base_url = base_url[:-1]
 
     api_url = f"{base_url}/sabnzbd/api"
+    # Sabnzbd treats limit=0 as "all slots", so always ask for at least one.
+    # The summary fields (kbpersec, mb, noofslots_total) are returned regardless.
+    queue_limit = max(1, int(config.get('queue_limit', 3)))
+    # The pipeline view needs every slot the *arr queues might refer to
+    fetch_limit = max(queue_limit, pipeline_config.get('max_items', 100)) if pipeline_config.get('enabled') else queue_limit
     params = {
         "mode": "queue",
         "output": "json",
-        "apikey": api_key
+        "apikey": api_key,
+        "limit": fetch_limit
     }
 
     logging.info(f"Attempting to connect to Sabnzbd: {base_url}")
     try:
-        response = requests.get(api_url, params=params, timeout=10)
-        response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-
         try:
-            data = response.json()
+            # Raises HTTPError for bad responses (4xx or 5xx)
+            data = http_get_json(api_url, params=params, service="sabnzbd")
         except json.JSONDecodeError:
              # Sabnzbd might return HTML on auth failure instead of a clean JSON error
              logging.error("Sabnzbd connection failed: Invalid response (Not JSON). Check URL and API Key.")
-             return {"status": "Error", "speed": "N/A", "queue_size": "N/A", "error": "Invalid Response/API Key?"}
+             return SabnzbdStatus(status="Error", speed="N/A", queue_size="N/A", error="Invalid Response/API Key?")
 
 
         if "error" in data: # Check for API-level errors (e.g., {'error': 'API Key Incorrect'})
@@ -208,14 +1020,16 @@ def get_sabnzbd_status(config):
              logging.error(f"Sabnzbd API error: {error_msg}")
              # Attempt to determine if it's an auth error
              if "api key" in error_msg.lower():
-                 return {"status": "Error", "speed": "N/A", "queue_size": "N/A", "error": "Unauthorized"}
+                 return SabnzbdStatus(status="Error", speed="N/A", queue_size="N/A", error="Unauthorized")
              else:
-                 return {"status": "Error", "speed": "N/A", "queue_size": "N/A", "error": f"API Error: {error_msg[:30]}"} # Truncate long errors
+                 return SabnzbdStatus(status="Error", speed="N/A", queue_size="N/A", error=f"API Error: {error_msg[:30]}") # Truncate long errors
 
 
         queue_data = data.get('queue', {})
         speed_kbps = float(queue_data.get('kbpersec', 0))
         size_mb = float(queue_data.get('mb', 0)) # Total size in MB
+        job_count = int(queue_data.get('noofslots_total', len(queue_data.get('slots', []))))
+        slots = [_format_sabnzbd_slot(slot) for slot in queue_data.get('slots', [])[:queue_limit]]
 
         # Format speed
         if speed_kbps < 1024:
@@ -230,39 +1044,62 @@ def get_sabnzbd_status(config):
              size_str = f"{size_mb / 1024:.1f} GB"
 
 
-        logging.info(f"Sabnzbd connection successful. Speed: {speed_str}, Queue Size: {size_str}")
-        return {"status": "Online", "speed": speed_str, "queue_size": size_str, "error": None}
+        pipeline_slots = None
+        if pipeline_config.get('enabled'):
+            pipeline_slots = _sabnzbd_pipeline_slots(queue_data.get('slots', []), speed_kbps * 1024)
+
+        completed = failed = None
+        if config.get('track_history', False):
+            try:
+                completed, failed = get_sabnzbd_history(api_url, api_key, base_url, int(config.get('history_limit', 20)))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # History is supplementary; keep the queue status if it fails
+                logging.warning(f"Sabnzbd history check failed: {e}")
+
+        logging.info(f"Sabnzbd connection successful. Speed: {speed_str}, Queue Size: {size_str}, Jobs: {job_count}")
+        return SabnzbdStatus(
+            status="Online",
+            speed=speed_str,
+            speed_kbps=speed_kbps,
+            queue_size=size_str,
+            jobs=job_count,
+            slots=slots,
+            pipeline_slots=pipeline_slots,
+            completed_last_hour=completed,
+            failed_last_hour=failed,
+            error=None
+        )
 
     except ReqConnectionError:
         logging.error(f"Sabnzbd connection failed: Could not connect to {base_url}.")
-        return {"status": "Offline", "speed": "N/A", "queue_size": "N/A", "error": "Connection failed"}
+        return SabnzbdStatus(status="Offline", speed="N/A", queue_size="N/A", error="Connection failed")
     except requests.exceptions.Timeout:
          logging.error(f"Sabnzbd connection failed: Timeout connecting to {base_url}.")
-         return {"status": "Offline", "speed": "N/A", "queue_size": "N/A", "error": "Timeout"}
+         return SabnzbdStatus(status="Offline", speed="N/A", queue_size="N/A", error="Timeout")
     except requests.exceptions.HTTPError as e:
          # Handle potential auth errors that might return 403 Forbidden
          if e.response.status_code == 403:
               logging.error("Sabnzbd connection failed: Forbidden (403). Check API Key and permissions.")
-              return {"status": "Error", "speed": "N/A", "queue_size": "N/A", "error": "Forbidden (403)"}
+              return SabnzbdStatus(status="Error", speed="N/A", queue_size="N/A", error="Forbidden (403)")
          else:
               logging.error(f"Sabnzbd connection failed: HTTP Error {e.response.status_code}")
-              return {"status": "Error", "speed": "N/A", "queue_size": "N/A", "error": f"HTTP {e.response.status_code}"}
+              return SabnzbdStatus(status="Error", speed="N/A", queue_size="N/A", error=f"HTTP {e.response.status_code}")
     except Exception as e:
         logging.exception(f"An unexpected error occurred connecting to Sabnzbd: {e}")
-        return {"status": "Error", "speed": "N/A", "queue_size": "N/A", "error": f"Unexpected: {type(e).__name__}"}
+        return SabnzbdStatus(status="Error", speed="N/A", queue_size="N/A", error=f"Unexpected: {type(e).__name__}")
 
 def get_tautulli_status(config):
     """Fetches status from Tautulli using its API."""
     if not config:
         logging.warning("Tautulli configuration missing in config.json")
-        return {"status": "Offline", "stream_count": "N/A", "total_bandwidth": "N/A", "error": "Config missing"}
+        return TautulliStatus(status="Offline", stream_count="N/A", total_bandwidth="N/A", error="Config missing")
 
     base_url = config.get('url')
     api_key = config.get('api_key')
 
     if not base_url or not api_key or 'YOUR_TAUTULLI_' in base_url or 'YOUR_TAUTULLI_' in api_key:
         logging.warning("Tautulli URL or API Key is missing or not configured in config.json")
-        return {"status": "Offline", "stream_count": "N/A", "total_bandwidth": "N/A", "error": "URL/API Key missing"}
+        return TautulliStatus(status="Offline", stream_count="N/A", total_bandwidth="N/A", error="URL/API Key missing")
 
     # Ensure base_url doesn't end with a slash for proper joining
     if base_url.endswith('/'):
@@ -278,15 +1115,12 @@ def get_tautulli_status(config):
 
     logging.info(f"Attempting to connect to Tautulli: {base_url}")
     try:
-        response = requests.get(api_url, params=session_params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = http_get_json(api_url, params=session_params, service="tautulli")
         
         if data.get('response', {}).get('result') != 'success':
             error_msg = data.get('response', {}).get('message', 'Unknown API Error')
             logging.error(f"Tautulli API error: {error_msg}")
-            return {"status": "Error", "stream_count": "N/A", "total_bandwidth": "N/A", "error": error_msg[:30]}
+            return TautulliStatus(status="Error", stream_count="N/A", total_bandwidth="N/A", error=error_msg[:30])
         
         # Extract activity data
         activity = data.get('response', {}).get('data', {})
@@ -302,42 +1136,43 @@ def get_tautulli_status(config):
             bandwidth_str = f"{total_bandwidth / (1024 * 1024):.1f} Gbps"
         
         logging.info(f"Tautulli connection successful. Streams: {stream_count}, Bandwidth: {bandwidth_str}")
-        return {
-            "status": "Online",
-            "stream_count": stream_count,
-            "total_bandwidth": bandwidth_str,
-            "error": None
-        }
+        return TautulliStatus(
+            status="Online",
+            stream_count=stream_count,
+            total_bandwidth=bandwidth_str,
+            bandwidth_kbps=total_bandwidth,
+            error=None
+        )
         
     except ReqConnectionError:
         logging.error(f"Tautulli connection failed: Could not connect to {base_url}.")
-        return {"status": "Offline", "stream_count": "N/A", "total_bandwidth": "N/A", "error": "Connection failed"}
+        return TautulliStatus(status="Offline", stream_count="N/A", total_bandwidth="N/A", error="Connection failed")
     except requests.exceptions.Timeout:
         logging.error(f"Tautulli connection failed: Timeout connecting to {base_url}.")
-        return {"status": "Offline", "stream_count": "N/A", "total_bandwidth": "N/A", "error": "Timeout"}
+        return TautulliStatus(status="Offline", stream_count="N/A", total_bandwidth="N/A", error="Timeout")
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 401:
             logging.error("Tautulli connection failed: Unauthorized (Invalid API Key?).")
-            return {"status": "Error", "stream_count": "N/A", "total_bandwidth": "N/A", "error": "Unauthorized"}
+            return TautulliStatus(status="Error", stream_count="N/A", total_bandwidth="N/A", error="Unauthorized")
         else:
             logging.error(f"Tautulli connection failed: HTTP Error {e.response.status_code}")
-            return {"status": "Error", "stream_count": "N/A", "total_bandwidth": "N/A", "error": f"HTTP {e.response.status_code}"}
+            return TautulliStatus(status="Error", stream_count="N/A", total_bandwidth="N/A", error=f"HTTP {e.response.status_code}")
     except Exception as e:
         logging.exception(f"An unexpected error occurred connecting to Tautulli: {e}")
-        return {"status": "Error", "stream_count": "N/A", "total_bandwidth": "N/A", "error": f"Unexpected: {type(e).__name__}"}
+        return TautulliStatus(status="Error", stream_count="N/A", total_bandwidth="N/A", error=f"Unexpected: {type(e).__name__}")
 
 def get_overseerr_status(config):
     """Fetches status from Overseerr using its API."""
     if not config:
         logging.warning("Overseerr configuration missing in config.json")
-        return {"status": "Offline", "pending_requests": "N/A", "error": "Config missing"}
+        return OverseerrStatus(status="Offline", pending_requests="N/A", error="Config missing")
 
     base_url = config.get('url')
     api_key = config.get('api_key')
 
     if not base_url or not api_key or 'YOUR_OVERSEERR_' in base_url or 'YOUR_OVERSEERR_' in api_key:
         logging.warning("Overseerr URL or API Key is missing or not configured in config.json")
-        return {"status": "Offline", "pending_requests": "N/A", "error": "URL/API Key missing"}
+        return OverseerrStatus(status="Offline", pending_requests="N/A", error="URL/API Key missing")
 
     # Ensure base_url doesn't end with a slash for proper joining
     if base_url.endswith('/'):
@@ -352,43 +1187,74 @@ def get_overseerr_status(config):
             "X-Api-Key": api_key
         }
         
-        response = requests.get(requests_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = http_get_json(requests_url, headers=headers, service="overseerr")
         
         # Extract pending requests count
         pending_count = data.get('pageInfo', {}).get('results', 0)
         
         logging.info(f"Overseerr connection successful. Pending requests: {pending_count}")
-        return {
-            "status": "Online",
-            "pending_requests": pending_count,
-            "error": None
-        }
+        return OverseerrStatus(
+            status="Online",
+            pending_requests=pending_count,
+            error=None
+        )
         
     except ReqConnectionError:
         logging.error(f"Overseerr connection failed: Could not connect to {base_url}.")
-        return {"status": "Offline", "pending_requests": "N/A", "error": "Connection failed"}
+        return OverseerrStatus(status="Offline", pending_requests="N/A", error="Connection failed")
     except requests.exceptions.Timeout:
         logging.error(f"Overseerr connection failed: Timeout connecting to {base_url}.")
-        return {"status": "Offline", "pending_requests": "N/A", "error": "Timeout"}
+        return OverseerrStatus(status="Offline", pending_requests="N/A", error="Timeout")
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 401:
             logging.error("Overseerr connection failed: Unauthorized (Invalid API Key?).")
-            return {"status": "Error", "pending_requests": "N/A", "error": "Unauthorized"}
+            return OverseerrStatus(status="Error", pending_requests="N/A", error="Unauthorized")
         else:
             logging.error(f"Overseerr connection failed: HTTP Error {e.response.status_code}")
-            return {"status": "Error", "pending_requests": "N/A", "error": f"HTTP {e.response.status_code}"}
+            return OverseerrStatus(status="Error", pending_requests="N/A", error=f"HTTP {e.response.status_code}")
     except Exception as e:
         logging.exception(f"An unexpected error occurred connecting to Overseerr: {e}")
-        return {"status": "Error", "pending_requests": "N/A", "error": f"Unexpected: {type(e).__name__}"}
+        return OverseerrStatus(status="Error", pending_requests="N/A", error=f"Unexpected: {type(e).__name__}")
+
+PIPELINE_TORRENT_FIELDS = ('name', 'progress', 'dlspeed', 'eta', 'state')
+# Status fields that only feed update_pipeline
+PIPELINE_INPUT_FIELDS = {"radarr": ("queue_items",), "sonarr": ("queue_items",), "sabnzbd": ("pipeline_slots",), "qbittorrent": ("torrent_delta",)}
+
+def _sync_qbittorrent_torrents(client, sync_state, requests_args=None):
+    """Fetches torrent changes since the last sync and returns them as a delta.
+
+    qBittorrent only sends the fields that changed, so they are merged into the
+    locally kept torrent and the complete (name, progress, dlspeed, eta, state)
+    tuple is reported for each hash where one of those fields changed. Hashes are upper-cased to match the
+    *arr downloadId.
+    """
+    data = client.sync_maindata(rid=sync_state["rid"], requests_args=requests_args)
+    sync_state["rid"] = data.get('rid', 0)
+    full = bool(data.get('full_update'))
+    if full:
+        sync_state["torrents"] = {}
+    torrents = sync_state["torrents"]
+
+    changed = {}
+    for torrent_hash, fields in (data.get('torrents') or {}).items():
+        # Seeding torrents report upspeed/ratio on every sync; those don't change the pipeline
+        if not full and not any(field in fields for field in PIPELINE_TORRENT_FIELDS):
+            continue
+        torrent = torrents.setdefault(torrent_hash, {})
+        torrent.update((field, fields[field]) for field in PIPELINE_TORRENT_FIELDS if field in fields)
+        changed[torrent_hash.upper()] = (
+            torrent.get('name', ''), float(torrent.get('progress', 0)) * 100,
+            int(torrent.get('dlspeed', 0)), int(torrent.get('eta', 0)), torrent.get('state', ''))
+    removed = [torrent_hash.upper() for torrent_hash in data.get('torrents_removed') or []]
+    for torrent_hash in data.get('torrents_removed') or []:
+        torrents.pop(torrent_hash, None)
+    return {"full": full, "changed": changed, "removed": removed}
 
 def get_qbittorrent_status(config):
     """Fetches status from qBittorrent using qbittorrent-api."""
     if not config:
         logging.warning("qBittorrent configuration missing in config.json")
-        return {"status": "Offline", "download_speed": "N/A", "upload_speed": "N/A", "active_torrents": "N/A", "error": "Config missing"}
+        return QbittorrentStatus(status="Offline", download_speed="N/A", upload_speed="N/A", active_torrents="N/A", error="Config missing")
 
     host_url = config.get('url')
     username = config.get('username')
@@ -397,32 +1263,41 @@ def get_qbittorrent_status(config):
     # Basic check if config seems default/missing
     if not host_url or 'YOUR_QBITTORRENT_' in host_url:
          logging.warning("qBittorrent URL is missing or not configured in config.json")
-         return {"status": "Offline", "download_speed": "N/A", "upload_speed": "N/A", "active_torrents": "N/A", "error": "URL missing"}
+         return QbittorrentStatus(status="Offline", download_speed="N/A", upload_speed="N/A", active_torrents="N/A", error="URL missing")
     # Username/Password can be optional for some setups, but warn if default
     if 'YOUR_QBITTORRENT_' in username or 'YOUR_QBITTORRENT_' in password:
          logging.warning("qBittorrent username or password might not be configured (using defaults).")
          # Allow connection attempt, might work without auth depending on qBit setup
 
+    load_service_library("qbittorrentapi")
     logging.info(f"Attempting to connect to qBittorrent: {host_url}")
-    client = qbittorrentapi.Client(
-        host=host_url,
-        username=username if 'YOUR_QBITTORRENT_' not in username else None, # Pass None if default
-        password=password if 'YOUR_QBITTORRENT_' not in password else None, # Pass None if default
-        REQUESTS_ARGS={'timeout': (10, 10)} # connect timeout, read timeout
-    )
+    # For the pipeline view the client stays logged in between cycles so qBittorrent's
+    # sync API can send only what changed since the last request (tracked by rid)
+    sync_state = qbittorrent_sync_state.setdefault(host_url, {"client": None, "rid": 0, "torrents": {}}) if pipeline_config.get('enabled') else None
+    client = sync_state["client"] if sync_state else None
+    succeeded = False
+    if client is None:
+        client = qbittorrentapi.Client(
+            host=host_url,
+            username=username if 'YOUR_QBITTORRENT_' not in username else None, # Pass None if default
+            password=password if 'YOUR_QBITTORRENT_' not in password else None, # Pass None if default
+        )
+    # Per-request arguments: the adaptive (connect, read) timeout and a hook that records response times
+    requests_args = {"timeout": service_timeout("qbittorrent"), "hooks": {"response": [_latency_hook("qbittorrent")]}}
 
     try:
-        client.auth_log_in()
-        logging.info("qBittorrent login successful.")
+        if not (sync_state and sync_state["client"]):
+            client.auth_log_in(requests_args=requests_args)
+            logging.info("qBittorrent login successful.")
 
         # Get global transfer info for speeds
-        transfer_info = client.transfer_info()
+        transfer_info = client.transfer_info(requests_args=requests_args)
         dl_speed_bytes = transfer_info.get('dl_info_speed', 0)
         ul_speed_bytes = transfer_info.get('up_info_speed', 0)
 
         # Get torrent list to count active ones (downloading or seeding)
-        torrents = client.torrents_info(status_filter='active') # Filters: all, downloading, seeding, completed, paused, active, inactive, resumed
-        active_count = len(torrents)
+        # Only the count is kept; the torrent list is released straight away
+        active_count = len(client.torrents_info(status_filter='active', requests_args=requests_args)) # Filters: all, downloading, seeding, completed, paused, active, inactive, resumed
 
         # Format speeds (convert B/s to KiB/s or MiB/s)
         def format_speed(speed_bytes):
@@ -437,41 +1312,138 @@ def get_qbittorrent_status(config):
         ul_speed_str = format_speed(ul_speed_bytes)
 
         logging.info(f"qBittorrent status fetched. DL: {dl_speed_str}, UL: {ul_speed_str}, Active: {active_count}")
-        return {
-            "status": "Online",
-            "download_speed": dl_speed_str,
-            "upload_speed": ul_speed_str,
-            "active_torrents": active_count,
-            "error": None
-        }
+        torrent_delta = None
+        if sync_state:
+            torrent_delta = _sync_qbittorrent_torrents(client, sync_state, requests_args)
+            sync_state["client"] = client
+        succeeded = True
+        return QbittorrentStatus(
+            status="Online",
+            download_speed=dl_speed_str,
+            upload_speed=ul_speed_str,
+            download_bytes=dl_speed_bytes,
+            upload_bytes=ul_speed_bytes,
+            active_torrents=active_count,
+            torrent_delta=torrent_delta,
+            error=None
+        )
 
     except LoginFailed:
         logging.error("qBittorrent connection failed: Login Failed (Incorrect username/password?).")
-        return {"status": "Error", "download_speed": "N/A", "upload_speed": "N/A", "active_torrents": "N/A", "error": "Login Failed"}
-    except APIConnectionError:
+        return QbittorrentStatus(status="Error", download_speed="N/A", upload_speed="N/A", active_torrents="N/A", error="Login Failed")
+    except APIConnectionError as e:
+        # qbittorrentapi raises its own connection error for request timeouts too
+        if isinstance(e.__context__, requests.exceptions.Timeout):
+            record_timeout("qbittorrent")
+            logging.error(f"qBittorrent connection failed: Timeout connecting to {host_url}.")
+            return QbittorrentStatus(status="Offline", download_speed="N/A", upload_speed="N/A", active_torrents="N/A", error="Timeout")
         logging.error(f"qBittorrent connection failed: Could not connect to {host_url}.")
-        return {"status": "Offline", "download_speed": "N/A", "upload_speed": "N/A", "active_torrents": "N/A", "error": "Connection failed"}
+        return QbittorrentStatus(status="Offline", download_speed="N/A", upload_speed="N/A", active_torrents="N/A", error="Connection failed")
     except APIError as e:
          logging.error(f"qBittorrent API error: {e.description} (Code: {e.code})")
-         return {"status": "Error", "download_speed": "N/A", "upload_speed": "N/A", "active_torrents": "N/A", "error": f"API Error {e.code}"}
+         return QbittorrentStatus(status="Error", download_speed="N/A", upload_speed="N/A", active_torrents="N/A", error=f"API Error {e.code}")
     except Exception as e:
         # Catch potential timeouts specifically if possible (depends on underlying requests exceptions)
         if isinstance(e, requests.exceptions.Timeout):
              logging.error(f"qBittorrent connection failed: Timeout connecting to {host_url}.")
-             return {"status": "Offline", "download_speed": "N/A", "upload_speed": "N/A", "active_torrents": "N/A", "error": "Timeout"}
+             return QbittorrentStatus(status="Offline", download_speed="N/A", upload_speed="N/A", active_torrents="N/A", error="Timeout")
         logging.exception(f"An unexpected error occurred connecting to qBittorrent: {e}")
-        return {"status": "Error", "download_speed": "N/A", "upload_speed": "N/A", "active_torrents": "N/A", "error": f"Unexpected: {type(e).__name__}"}
+        return QbittorrentStatus(status="Error", download_speed="N/A", upload_speed="N/A", active_torrents="N/A", error=f"Unexpected: {type(e).__name__}")
     finally:
-        # Ensure logout happens even if errors occur after login
-        try:
-            if client.is_logged_in:
-                client.auth_log_out()
-                logging.debug("qBittorrent logout successful.")
-        except Exception as logout_e:
-            logging.warning(f"Error during qBittorrent logout: {logout_e}")
+        if sync_state is not None:
+            if not succeeded:
+                # Start over with a fresh login (and a full sync) next cycle
+                sync_state["client"] = None
+                sync_state["rid"] = 0
+        else:
+            # Ensure logout happens even if errors occur after login
+            try:
+                if client.is_logged_in:
+                    client.auth_log_out(requests_args=requests_args)
+                    logging.debug("qBittorrent logout successful.")
+            except Exception as logout_e:
+                logging.warning(f"Error during qBittorrent logout: {logout_e}")
+
+SERVICE_EMOJIS = {
+    "plex": "🎬",
+    "radarr": "🎥",
+    "sonarr": "📺",
+    "sabnzbd": "💾",
+    "qbittorrent": "🔄",
+    "tautulli": "📊",
+    "overseerr": "🔍",
+    "pipeline": "🧩"
+}
+# Dashboard layout: (section, title, services) in the order the messages are posted
+DISCORD_SECTIONS = (
+    ("streaming", "🎬 Streaming", ("plex", "tautulli")),
+    ("downloads", "📥 Downloads", ("radarr", "sonarr", "sabnzbd", "qbittorrent", "pipeline")),
+    ("requests", "🔍 Requests", ("overseerr",)),
+)
+BLANK_FIELD = {"name": "\u200b", "value": "\u200b", "inline": True}
+rendered_fields = {} # service -> (status record, embed field) from the last render
+
+def _format_service_field(service, data):
+    """Builds the embed field for one service."""
+    emoji = SERVICE_EMOJIS.get(service, "❓")
+    if data.get("status") == "Skipped":
+        status_text = "Not checked yet"
+        value = f"Status: ⏳ {status_text}"
+    elif data.get("error"):
+        status_text = f"🔴 Error: {data['error']}"
+        value = f"Status: {status_text}"
+    elif data.get("status") == "Offline":
+        status_text = "Offline"
+        value = f"Status: {status_text}"
+    else:
+        status_text = "Online"
+        details = []
+        # Add specific details based on service
+        if service == "plex":
+            details.append(f"Sessions: {data.get('sessions', 'N/A')}")
+            for title, count, growth in (data.get('library') or ())[:6]:
+                details.append(f"▸ {title[:20]}: {count:,}" + (f" ({growth:+,})" if growth else ""))
+        elif service in ("radarr", "sonarr"):
+            details.append(f"Queue: {data.get('queue_count', 'N/A')}")
+            if data.get('health'):
+                details.append(f"⚠️ {data['health'][:60]}")
+        elif service == "sabnzbd":
+            details.append(f"Speed: {data.get('speed', 'N/A')}")
+            details.append(f"Queue: {data.get('queue_size', 'N/A')}")
+            details.append(f"Jobs: {data.get('jobs', 'N/A')}")
+            if data.get('completed_last_hour') is not None:
+                details.append(f"Done (1h): {data['completed_last_hour']}")
+                details.append(f"Failed (1h): {data['failed_last_hour']}")
+            for slot in data.get('slots') or []:
+                details.append(f"▸ {slot['filename'][:30]} ({slot['percentage']}%)")
+        elif service == "qbittorrent":
+            details.append(f"DL: {data.get('download_speed', 'N/A')}")
+            details.append(f"UL: {data.get('upload_speed', 'N/A')}")
+            details.append(f"Active: {data.get('active_torrents', 'N/A')}")
+        elif service == "tautulli":
+            details.append(f"Streams: {data.get('stream_count', 'N/A')}")
+            details.append(f"Bandwidth: {data.get('total_bandwidth', 'N/A')}")
+        elif service == "overseerr":
+            details.append(f"Pending: {data.get('pending_requests', 'N/A')}")
+        elif service == "pipeline":
+            details.append(f"Items: {data.get('items', 'N/A')}")
+            details.append(f"Stalled: {data.get('stalled', 'N/A')}")
+            for title, client, progress in data.get('stalled_items') or []:
+                details.append(f"⚠️ {title[:30]} ({client}, {progress}%)")
+
+        value = f"Status:🟢 {status_text}\n" + "\n".join(details)
+
+    return {
+        "name": f"{emoji} {service.capitalize()}",
+        "value": value,
+        "inline": True # Display fields side-by-side where possible
+    }
 
 def format_discord_message(statuses):
-    """Formats the collected statuses into a Discord embed message."""
+    """Formats the collected statuses into a Discord embed message.
+
+    A service whose status is unchanged since the last render reuses its field.
+    """
     logging.info("Formatting Discord message...")
     embed = {
         "title": "Plex Ecosystem Monitor Status",
@@ -484,86 +1456,76 @@ def format_discord_message(statuses):
         "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
     }
 
-    service_emojis = {
-        "plex": "🎬",
-        "radarr": "🎥",
-        "sonarr": "📺",
-        "sabnzbd": "💾",
-        "qbittorrent": "🔄",
-        "tautulli": "📊",
-        "overseerr": "🔍"
-    }
-
     for service, data in statuses.items():
-        emoji = service_emojis.get(service, "❓")
-        if data.get("error"):
-            status_text = f"🔴 Error: {data['error']}"
-            value = f"Status: {status_text}"
-        elif data.get("status") == "Offline":
-            status_text = "Offline"
-            value = f"Status: {status_text}"
-        else:
-            status_text = "Online"
-            details = []
-            # Add specific details based on service
-            if service == "plex":
-                details.append(f"Sessions: {data.get('sessions', 'N/A')}")
-            elif service == "radarr":
-                details.append(f"Queue: {data.get('queue_count', 'N/A')}")
-            elif service == "sonarr":
-                details.append(f"Queue: {data.get('queue_count', 'N/A')}")
-            elif service == "sabnzbd":
-                details.append(f"Speed: {data.get('speed', 'N/A')}")
-                details.append(f"Queue: {data.get('queue_size', 'N/A')}")
-            elif service == "qbittorrent":
-                details.append(f"DL: {data.get('download_speed', 'N/A')}")
-                details.append(f"UL: {data.get('upload_speed', 'N/A')}")
-                details.append(f"Active: {data.get('active_torrents', 'N/A')}")
-            elif service == "tautulli":
-                details.append(f"Streams: {data.get('stream_count', 'N/A')}")
-                details.append(f"Bandwidth: {data.get('total_bandwidth', 'N/A')}")
-            elif service == "overseerr":
-                details.append(f"Pending: {data.get('pending_requests', 'N/A')}")
-
-            value = f"Status:🟢 {status_text}\n" + "\n".join(details)
-
-        embed["fields"].append({
-            "name": f"{emoji} {service.capitalize()}",
-            "value": value,
-            "inline": True # Display fields side-by-side where possible
-        })
+        embed["fields"].append(_render_field(service, data))
 
      # Ensure an even number of fields for better inline display if needed
     if len(embed["fields"]) % 2 != 0 and len(embed["fields"]) > 1 :
-         embed["fields"].append({"name": "\u200b", "value": "\u200b", "inline": True}) # Add blank field
+         embed["fields"].append(BLANK_FIELD) # Add blank field
 
 
     return {"embeds": [embed]}
 
+def _render_field(service, data):
+    """Returns the embed field for a service, reusing the last one if its status is unchanged."""
+    cached = rendered_fields.get(service)
+    if cached and cached[0] == data:
+        return cached[1]
+    field = _format_service_field(service, data)
+    rendered_fields[service] = (data, field)
+    return field
+
+def format_discord_sections(statuses):
+    """Splits the board into one message per dashboard section.
+
+    Returns (section, message_data, content_hash) for each section that has at
+    least one service. The hash only covers the section's fields, not its
+    timestamps, so it stays the same until one of its services changes.
+    """
+    sections = []
+    for section, title, services in DISCORD_SECTIONS:
+        fields = [_render_field(service, statuses[service]) for service in services if service in statuses]
+        if not fields:
+            continue
+        if len(fields) % 2 != 0 and len(fields) > 1:
+            fields.append(BLANK_FIELD)
+        content_hash = hashlib.sha1(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+        embed = {
+            "title": title,
+            "description": f"Last changed: <t:{int(time.time())}:R>",
+            "color": 0x0099ff,
+            "fields": fields,
+            "footer": {
+                "text": "Plex Monitor by Roo"
+            },
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        }
+        sections.append((section, {"embeds": [embed]}, content_hash))
+    return sections
+
 def send_discord_message(webhook_url, message_data):
-    """Sends a new message to the Discord webhook."""
-    global discord_message_id
+    """Sends a new message to the Discord webhook. Returns the new message ID, or None on failure."""
     if not webhook_url or 'YOUR_DISCORD_WEBHOOK_URL_HERE' in webhook_url:
         logging.warning("Discord webhook URL not configured. Skipping message send.")
-        return False
+        return None
     try:
         # Add wait=True to get the message ID back from Discord
         response = requests.post(f"{webhook_url}?wait=true", json=message_data, timeout=10)
         response.raise_for_status()
         response_data = response.json()
-        discord_message_id = response_data.get('id')
-        if discord_message_id:
-            logging.info(f"Initial Discord message sent. Message ID: {discord_message_id}")
-            return True
+        message_id = response_data.get('id')
+        if message_id:
+            logging.info(f"Initial Discord message sent. Message ID: {message_id}")
+            return message_id
         else:
             logging.error("Failed to get message ID from Discord response.")
-            return False
+            return None
     except requests.exceptions.RequestException as e:
         logging.error(f"Error sending Discord message: {e}")
-        return False
+        return None
     except Exception as e:
         logging.error(f"An unexpected error occurred sending Discord message: {e}")
-        return False
+        return None
 
 
 def update_discord_message(webhook_url, message_id, message_data):
@@ -596,52 +1558,1282 @@ def update_discord_message(webhook_url, message_id, message_data):
         return False
 
 
+# --- Status Collection ---
+# Probe function names by service, in display order. Names are resolved at call time
+# so worker processes (and tests) always use the module's current functions.
+SERVICE_PROBES = {
+    "plex": "get_plex_status",
+    "radarr": "get_radarr_status",
+    "sonarr": "get_sonarr_status",
+    "sabnzbd": "get_sabnzbd_status",
+    "qbittorrent": "get_qbittorrent_status",
+    "tautulli": "get_tautulli_status",
+    "overseerr": "get_overseerr_status",
+}
+
+def _skipped_status(service, reason):
+    """Returns the status reported for a service that wasn't polled this cycle.
+
+    "Skipped" isn't a failure: merge_polled_statuses keeps the service's last
+    known status instead, and alert rules ignore it.
+    """
+    return STATUS_RECORDS[service](status="Skipped", error=f"Skipped ({reason})")
+
+def merge_polled_statuses(polled):
+    """Stores a cycle's results in current_statuses and returns the statuses to publish.
+
+    Services that were skipped keep their last known status and are polled again
+    next cycle, even if they are otherwise only reconciled (see webhooks.services).
+    """
+    with status_lock:
+        for service, data in polled.items():
+            if data.get('status') == "Skipped":
+                pending_reconcile.add(service)
+                if service in current_statuses:
+                    continue
+            current_statuses[service] = data
+        return {service: current_statuses[service] for service in SERVICE_PROBES if service in current_statuses}
+
+def collect_statuses(config, services=None):
+    """Polls the given services (all of them by default) in this process.
+
+    Probes share the cycle budget: request timeouts are limited to what is left
+    of it, and services still waiting once it has run out are reported as
+    skipped for this cycle.
+    """
+    global cycle_deadline
+    service_configs = config.get('services', {})
+    budget = timeout_config.get('cycle_budget_seconds')
+    cycle_deadline = time.perf_counter() + budget if budget else None
+    statuses = {}
+    try:
+        for service in (SERVICE_PROBES if services is None else services):
+            if shutdown_event.is_set():
+                # Let the probe in flight finish, but don't start new ones while shutting down
+                statuses[service] = _skipped_status(service, "shutting down")
+                continue
+            if cycle_deadline is not None and time.perf_counter() >= cycle_deadline:
+                logging.warning(f"Cycle budget of {budget}s used up; skipping {service} this cycle.")
+                statuses[service] = _skipped_status(service, "cycle budget")
+                continue
+            statuses[service] = globals()[SERVICE_PROBES[service]](service_configs.get(service))
+    finally:
+        cycle_deadline = None
+    return statuses
+
+def _shard_worker(conn, config, services, stop_event=None):
+    """Entry point for a polling worker process.
+
+    Waits for a poll request from the coordinator, polls its shard of services and
+    sends the results back. Module state (e.g. Sabnzbd history, the response cache)
+    lives for the life of the worker, so incremental tracking keeps working between
+    cycles.
+    """
+    global shutdown_event
+    # Signals are handled by the coordinator, which stops the workers itself
+    for name in ('SIGTERM', 'SIGINT', 'SIGHUP', 'SIGUSR1'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_IGN)
+    if stop_event is not None:
+        # Set by the coordinator on shutdown, so collect_statuses stops starting new probes
+        shutdown_event = stop_event
+    configure_runtime(config)
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if request is None:
+            break
+        # The coordinator sends the services due this cycle and any Plex library sections to recount
+        with status_lock:
+            plex_library_stale.update(request["plex_library_stale"])
+        conn.send(collect_statuses(config, [service for service in services if service in request["services"]]))
+    conn.close()
+
+
+WORKER_WAIT_SLICE_SECONDS = 0.25
+
+class ShardedPoller:
+    """Spreads the configured services over a pool of worker processes.
+
+    Each worker owns a fixed shard of services so JSON parsing and client library
+    work run on separate cores. The coordinator merges the shards' results into a
+    single statuses snapshot in display order.
+    """
+
+    def __init__(self, config, worker_count, timeout=60):
+        self.config = config
+        self.timeout = timeout
+        service_configs = config.get('services', {})
+        configured = [service for service in SERVICE_PROBES if service_configs.get(service)]
+        # Unconfigured services return immediately, so keep them in the coordinator
+        self.local_services = [service for service in SERVICE_PROBES if service not in configured]
+        self.shards = [shard for shard in (configured[i::worker_count] for i in range(worker_count)) if shard]
+        self.workers = [None] * len(self.shards)
+        self.stop_event = multiprocessing.Event()
+
+    def _spawn(self, index):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_shard_worker,
+            args=(child_conn, self.config, self.shards[index], self.stop_event),
+            name=f"poller-{index}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.workers[index] = (process, parent_conn)
+        logging.info(f"Started polling worker {index} (pid {process.pid}) for: {', '.join(self.shards[index])}")
+
+    def start(self):
+        for index in range(len(self.shards)):
+            self._spawn(index)
+
+    def _restart(self, index):
+        process, conn = self.workers[index]
+        conn.close()
+        if process.is_alive():
+            process.terminate()
+        process.join(1)
+        self._spawn(index)
+
+    def poll(self, services=None):
+        """Runs one cycle across the workers and returns the merged statuses.
+
+        Only `services` (all of them by default) are polled; workers whose shard has
+        nothing due are skipped.
+        """
+        global plex_library_stale
+        due = list(SERVICE_PROBES) if services is None else list(services)
+        active = [index for index, shard in enumerate(self.shards) if any(service in due for service in shard)]
+        # Plex webhooks arrive in this process; hand their invalidations to the worker polling Plex
+        if any("plex" in self.shards[index] for index in active):
+            with status_lock:
+                stale, plex_library_stale = plex_library_stale, set()
+        else:
+            stale = set()
+        for index in active:
+            request = {"services": due, "plex_library_stale": stale if "plex" in self.shards[index] else set()}
+            try:
+                self.workers[index][1].send(request)
+            except (BrokenPipeError, OSError):
+                logging.error(f"Polling worker {index} is gone; restarting it.")
+                self._restart(index)
+                self.workers[index][1].send(request)
+
+        results = collect_statuses(self.config, [service for service in self.local_services if service in due])
+        deadline = time.time() + self.timeout
+        # Wait in short slices so a shutdown request doesn't have to wait for slow workers
+        from multiprocessing.connection import wait # Already loaded by Pipe()
+        waiting = {self.workers[index][1]: index for index in active}
+        while waiting:
+            if shutdown_event.is_set():
+                self.stop_event.set()
+                for index in waiting.values():
+                    logging.info(f"Shutting down; not waiting for polling worker {index}.")
+                    for service in self.shards[index]:
+                        if service in due:
+                            results[service] = _skipped_status(service, "shutting down")
+                break
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                for index in waiting.values():
+                    self._fail(index, due, results, "no response before the cycle timeout")
+                break
+            for conn in wait(list(waiting), min(remaining, WORKER_WAIT_SLICE_SECONDS)):
+                index = waiting.pop(conn)
+                try:
+                    results.update(conn.recv())
+                except (EOFError, OSError) as e:
+                    self._fail(index, due, results, e)
+
+        return {service: results[service] for service in SERVICE_PROBES if service in results}
+
+    def _fail(self, index, due, results, reason):
+        logging.error(f"Polling worker {index} failed ({reason}); restarting it.")
+        for service in self.shards[index]:
+            if service in due:
+                results[service] = STATUS_RECORDS[service](status="Error", error="Worker failed")
+        self._restart(index)
+
+    def stop(self, timeout=2):
+        """Stops the workers, terminating any still busy after `timeout` seconds in total."""
+        self.stop_event.set()
+        for process, conn in self.workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        deadline = time.time() + timeout
+        for process, _ in self.workers:
+            process.join(max(0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+
+
+# --- Download Pipeline ---
+QBITTORRENT_DOWNLOADING_STATES = ('downloading', 'forcedDL', 'stalledDL', 'metaDL', 'forcedMetaDL')
+QBITTORRENT_INFINITE_ETA = 8640000
+
+def _build_pipeline_row(service, title, size, sizeleft, client, client_item):
+    """Builds a (service, title, client, progress, speed, eta, downloading) row for one queue item."""
+    if client == "qBittorrent":
+        _, progress, speed, eta, state = client_item
+        eta = None if eta >= QBITTORRENT_INFINITE_ETA else eta
+        downloading = state in QBITTORRENT_DOWNLOADING_STATES
+    elif client == "Sabnzbd":
+        _, progress, speed, eta, downloading = client_item
+    else:
+        progress = 100 * (1 - sizeleft / size) if size else 0
+        speed, eta, downloading = 0, None, False
+    return (service, title, client, progress, speed, eta, downloading)
+
+def update_pipeline(statuses, now=None):
+    """Joins Radarr/Sonarr queue items with qBittorrent and Sabnzbd by download ID.
+
+    Download client items are kept in hash indexes that are updated from each
+    cycle's deltas, and a row is only rebuilt when its inputs changed, so the
+    per-item work is proportional to what changed. Items that should be
+    downloading but have had no speed for `stall_minutes` are flagged as stalled.
+    Returns the summary shown on the board as the "pipeline" entry.
+    """
+    if now is None:
+        now = time.time()
+    state = pipeline_state
+
+    delta = (statuses.get('qbittorrent') or {}).get('torrent_delta')
+    if delta:
+        if delta["full"]:
+            state["torrents"] = dict(delta["changed"])
+        else:
+            state["torrents"].update(delta["changed"])
+            for torrent_hash in delta["removed"]:
+                state["torrents"].pop(torrent_hash, None)
+    sab_slots = (statuses.get('sabnzbd') or {}).get('pipeline_slots')
+    if sab_slots is not None:
+        state["sab_slots"] = sab_slots
+
+    rows, inputs, zero_speed_since = state["rows"], state["inputs"], state["zero_speed_since"]
+    seen = set()
+    for service in ("radarr", "sonarr"):
+        for download_id, title, size, sizeleft in (statuses.get(service) or {}).get('queue_items') or []:
+            seen.add(download_id)
+            if download_id in state["torrents"]:
+                client, client_item = "qBittorrent", state["torrents"][download_id]
+            elif download_id in state["sab_slots"]:
+                client, client_item = "Sabnzbd", state["sab_slots"][download_id]
+            else:
+                client, client_item = "Unknown", None
+            item_inputs = (service, title, size, sizeleft, client_item)
+            if inputs.get(download_id) == item_inputs:
+                continue
+            inputs[download_id] = item_inputs
+            row = _build_pipeline_row(service, title, size, sizeleft, client, client_item)
+            rows[download_id] = row
+            if row[6] and row[4] == 0 and row[3] < 100:
+                zero_speed_since.setdefault(download_id, now)
+            else:
+                zero_speed_since.pop(download_id, None)
+
+    for download_id in [download_id for download_id in rows if download_id not in seen]:
+        del rows[download_id]
+        del inputs[download_id]
+        zero_speed_since.pop(download_id, None)
+
+    stall_seconds = pipeline_config.get('stall_minutes', 10) * 60
+    stalled = [rows[download_id] for download_id, since in zero_speed_since.items() if now - since >= stall_seconds]
+    if stalled:
+        logging.warning(f"Download pipeline: {len(stalled)} stalled item(s), e.g. '{stalled[0][1]}' in {stalled[0][2]} at {stalled[0][3]:.0f}%")
+    return PipelineStatus(
+        status="Online",
+        items=len(rows),
+        stalled=len(stalled),
+        stalled_items=[(title, client, round(progress, 1)) for _, title, client, progress, _, _, _ in stalled[:5]],
+        error=None
+    )
+
+
+# --- Notification Sinks ---
+class NotificationSink:
+    """Base class for status outputs.
+
+    Each sink has its own bounded queue and delivery thread, so a slow or failing
+    output never stalls polling. When the queue is full the oldest pending snapshot
+    is dropped; only the latest state matters for a status board.
+    """
+
+    def __init__(self, name, queue_size=1):
+        self.name = name
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name=f"sink-{name}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, snapshot):
+        """Queues a snapshot for delivery without blocking the caller."""
+        while True:
+            try:
+                self.queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                    logging.debug(f"Sink '{self.name}' is behind; dropped a stale snapshot.")
+                except queue.Empty:
+                    pass
+
+    def stop(self, timeout=10):
+        """Delivers anything still queued, then stops the delivery thread."""
+        deadline = time.time() + timeout
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            logging.warning(f"Sink '{self.name}' did not drain before shutdown.")
+            return
+        self.thread.join(max(0, deadline - time.time()))
+
+    def _run(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                break
+            try:
+                self.deliver(snapshot)
+            except Exception as e:
+                logging.error(f"Sink '{self.name}' failed to deliver update: {e}")
+
+    def deliver(self, snapshot):
+        raise NotImplementedError
+
+    def export_state(self):
+        """Returns state worth handing over to another replica (see HA mode)."""
+        return {}
+
+    def restore_state(self, state):
+        pass
+
+
+class DiscordSink(NotificationSink):
+    """Keeps a Discord status board up to date, editing it in place.
+
+    With the "single" layout the board is one message. With "sections" each
+    dashboard section (see DISCORD_SECTIONS) is its own message and only
+    sections whose content changed are edited, so the size and number of
+    requests per update don't grow with the number of services.
+    """
+
+    def __init__(self, name, webhook_url, queue_size=1, layout="single"):
+        super().__init__(name, queue_size)
+        self.webhook_url = webhook_url
+        self.layout = layout
+        self.message_id = None
+        self.section_ids = {} # section -> message ID
+        self.section_hashes = {} # section -> content hash last delivered
+
+    def deliver(self, snapshot):
+        if self.layout == "sections":
+            return self._deliver_sections(snapshot["statuses"])
+        message_data = snapshot["discord"]
+        if self.message_id:
+            logging.info(f"Attempting to update message ID: {self.message_id}")
+            update_status = update_discord_message(self.webhook_url, self.message_id, message_data)
+            if update_status == "send_new":
+                self.message_id = None # Reset message ID as it's invalid
+                logging.info("Previous message not found, attempting to send a new one.")
+                self.message_id = send_discord_message(self.webhook_url, message_data)
+            elif not update_status:
+                logging.warning("Failed to update Discord message. Will retry next cycle.")
+        else:
+            logging.info("No existing message ID found, sending initial message.")
+            self.message_id = send_discord_message(self.webhook_url, message_data)
+
+    def _deliver_sections(self, statuses):
+        for section, message_data, content_hash in format_discord_sections(statuses):
+            message_id = self.section_ids.get(section)
+            if message_id and self.section_hashes.get(section) == content_hash:
+                continue
+            if message_id:
+                update_status = update_discord_message(self.webhook_url, message_id, message_data)
+                if update_status == "send_new":
+                    logging.info(f"Message for section '{section}' not found, attempting to send a new one.")
+                    message_id = None
+                elif not update_status:
+                    logging.warning(f"Failed to update Discord section '{section}'. Will retry next cycle.")
+                    continue
+            if not message_id:
+                message_id = send_discord_message(self.webhook_url, message_data)
+                if not message_id:
+                    continue
+                self.section_ids[section] = message_id
+            self.section_hashes[section] = content_hash
+
+    def export_state(self):
+        # A copy: the sink thread adds section IDs while the main thread writes the HA snapshot
+        return {"message_id": self.message_id, "section_ids": dict(self.section_ids)}
+
+    def restore_state(self, state):
+        # Keep editing the board the previous leader created instead of posting a new one
+        self.message_id = state.get('message_id') or self.message_id
+        self.section_ids = {**self.section_ids, **(state.get('section_ids') or {})}
+
+
+def _snapshot_json(snapshot):
+    """Serializes a snapshot's raw statuses as a compact JSON document."""
+    statuses = {service: data._asdict() for service, data in snapshot["statuses"].items()}
+    return json.dumps({"timestamp": snapshot["timestamp"], "statuses": statuses}, separators=(',', ':'), default=str)
+
+
+class WebhookSink(NotificationSink):
+    """POSTs the raw statuses as JSON to a generic webhook."""
+
+    def __init__(self, name, url, headers=None, queue_size=1):
+        super().__init__(name, queue_size)
+        self.url = url
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def deliver(self, snapshot):
+        response = requests.post(self.url, data=_snapshot_json(snapshot), headers=self.headers, timeout=10)
+        response.raise_for_status()
+        logging.debug(f"Webhook sink '{self.name}' delivered update.")
+
+
+class FileSink(NotificationSink):
+    """Appends each snapshot as one line of NDJSON to a file."""
+
+    def __init__(self, name, path, queue_size=16):
+        super().__init__(name, queue_size)
+        self.path = path
+
+    def deliver(self, snapshot):
+        with open(self.path, 'a') as f:
+            f.write(_snapshot_json(snapshot) + "\n")
+
+
+class StdoutSink(NotificationSink):
+    """Writes each snapshot as one line of JSON to stdout for log scrapers."""
+
+    def __init__(self, name, queue_size=16):
+        super().__init__(name, queue_size)
+
+    def deliver(self, snapshot):
+        sys.stdout.write(_snapshot_json(snapshot) + "\n")
+        sys.stdout.flush()
+
+
+def build_sinks(config):
+    """Creates the configured sinks, defaulting to the single Discord webhook."""
+    sink_configs = config.get('sinks')
+    if not sink_configs:
+        return [DiscordSink("discord", config.get('discord_webhook_url'), layout=config.get('discord_layout', 'single'))]
+
+    sinks = []
+    for index, sink_config in enumerate(sink_configs):
+        sink_type = sink_config.get('type')
+        name = sink_config.get('name', f"{sink_type}-{index}")
+        queue_size = sink_config.get('queue_size')
+        extra = {"queue_size": queue_size} if queue_size else {}
+        if sink_type == "discord":
+            layout = sink_config.get('layout') or config.get('discord_layout', 'single')
+            sinks.append(DiscordSink(name, sink_config.get('webhook_url') or config.get('discord_webhook_url'), layout=layout, **extra))
+        elif sink_type == "webhook":
+            sinks.append(WebhookSink(name, sink_config.get('url'), sink_config.get('headers'), **extra))
+        elif sink_type == "file":
+            sinks.append(FileSink(name, sink_config.get('path', 'plex_monitor_status.ndjson'), **extra))
+        elif sink_type == "stdout":
+            sinks.append(StdoutSink(name, **extra))
+        else:
+            logging.warning(f"Unknown sink type '{sink_type}' in config.json; skipping.")
+    return sinks
+
+
+class SinkDispatcher:
+    """Fans each cycle's snapshot out to every sink concurrently."""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+
+    def publish(self, statuses, message_data):
+        snapshot = {"timestamp": time.time(), "statuses": statuses, "discord": message_data}
+        for sink in self.sinks:
+            sink.submit(snapshot)
+
+    def stop(self, timeout=10):
+        deadline = time.time() + timeout
+        for sink in self.sinks:
+            sink.stop(max(0, deadline - time.time()))
+
+    def export_state(self):
+        return {sink.name: sink.export_state() for sink in self.sinks}
+
+    def restore_state(self, state):
+        for sink in self.sinks:
+            if sink.name in state:
+                sink.restore_state(state[sink.name])
+
+
+# --- Alerting ---
+def _alert_rule_key(rule):
+    """Returns a stable identifier for an alert rule."""
+    if rule.get('name'):
+        return rule['name']
+    target = rule.get('field') or rule.get('to', 'down')
+    return f"{rule.get('service')}:{rule.get('type', 'state')}:{target}"
+
+def _alert_condition(rule, data, previous_status, armed):
+    """Evaluates a single rule against a service's status.
+
+    `armed` is True while the rule is pending or active. Once armed, state rules
+    only need the service to stay in the target state and threshold rules only
+    clear once the value drops below `clear_below` (hysteresis).
+    """
+    status = data.get('status')
+    if rule.get('type', 'state') == 'state':
+        targets = rule.get('to', ["Offline", "Error"])
+        if isinstance(targets, str):
+            targets = [targets]
+        if status not in targets:
+            return False
+        return armed or rule.get('from') is None or previous_status == rule.get('from')
+
+    value = data.get(rule.get('field'))
+    if not isinstance(value, (int, float)):
+        return False # Unknown (e.g. service down); state rules cover that case
+    limit = rule.get('clear_below', rule['above']) if armed else rule['above']
+    return value > limit
+
+def _describe_alert(rule, service, data):
+    """Builds the human readable text for an alert."""
+    label = rule.get('name') or _alert_rule_key(rule)
+    if rule.get('type', 'state') == 'state':
+        detail = f"{service.capitalize()} is {data.get('status', 'Unknown')}"
+        if data.get('error'):
+            detail += f" ({data['error']})"
+    else:
+        detail = f"{service.capitalize()} {rule['field']} is {data.get(rule['field'], 'N/A')} (limit {rule['above']})"
+    return label, detail
+
+def evaluate_alerts(alerts_config, statuses, now=None):
+    """Evaluates alert rules against this cycle's statuses.
+
+    Runs in O(rules) using only the statuses already collected, so no extra
+    upstream calls are made. Returns a list of (kind, title, detail, key) tuples
+    where kind is "fire" or "resolve"; each alert is reported once when it starts
+    and once when it clears. An alert that starts again within the cooldown is
+    announced once the cooldown has passed, if it is still active by then.
+
+    `notified` only changes once a message was actually delivered (see
+    record_alert_delivery), so an alert whose message failed is sent again on
+    the next cycle.
+    """
+    if now is None:
+        now = time.time()
+    cooldown = alerts_config.get('cooldown_minutes', 30) * 60
+    events = []
+
+    with alert_lock:
+        for rule in alerts_config.get('rules', []):
+            service = rule.get('service')
+            if service not in statuses:
+                continue
+            data = statuses[service]
+            if data.get('status') == "Skipped":
+                continue # Not contacted this cycle: neither a failure nor a recovery
+            key = _alert_rule_key(rule)
+            state = alert_states.setdefault(key, {"pending_since": None, "active": False, "notified": False,
+                                                  "sending": None, "last_notified": None})
+            armed = state["active"] or state["pending_since"] is not None
+
+            if _alert_condition(rule, data, previous_service_states.get(service), armed):
+                if state["pending_since"] is None:
+                    state["pending_since"] = now
+                if not state["active"] and now - state["pending_since"] >= rule.get('for_minutes', 0) * 60:
+                    state["active"] = True
+                    if state["last_notified"] is not None and now - state["last_notified"] < cooldown:
+                        logging.info(f"Alert '{key}' triggered again within cooldown; notifying once the cooldown ends if it is still active.")
+                if state["active"] and not state["notified"] and not state["sending"] and \
+                        (state["last_notified"] is None or now - state["last_notified"] >= cooldown):
+                    state["sending"] = "fire"
+                    events.append(("fire",) + _describe_alert(rule, service, data) + (key,))
+            else:
+                state["pending_since"] = None
+                state["active"] = False
+                if state["notified"] and not state["sending"]:
+                    state["sending"] = "resolve"
+                    events.append(("resolve",) + _describe_alert(rule, service, data) + (key,))
+
+    for service, data in statuses.items():
+        if data.get('status') != "Skipped":
+            previous_service_states[service] = data.get('status')
+    return events
+
+def record_alert_delivery(key, kind, delivered, now=None):
+    """Updates an alert's state once its message was sent, or failed to send."""
+    with alert_lock:
+        state = alert_states.get(key)
+        if state is None or state["sending"] != kind:
+            return
+        state["sending"] = None
+        if not delivered:
+            logging.warning(f"Alert '{key}' ({kind}) was not delivered; retrying next cycle.")
+        elif kind == "fire":
+            state["notified"] = True
+            state["last_notified"] = time.time() if now is None else now
+        else:
+            state["notified"] = False
+
+def send_alert_message(webhook_url, kind, title, detail):
+    """Posts a standalone alert or resolve notice to a Discord webhook."""
+    if not webhook_url or 'YOUR_DISCORD_WEBHOOK_URL_HERE' in webhook_url:
+        logging.warning("Alert webhook URL not configured. Skipping alert.")
+        return False
+    firing = kind == "fire"
+    message_data = {
+        "embeds": [{
+            "title": f"{'🚨 Alert' if firing else '✅ Resolved'}: {title}",
+            "description": detail,
+            "color": 0xff0000 if firing else 0x00cc66,
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        }]
+    }
+    try:
+        response = requests.post(webhook_url, json=message_data, timeout=10)
+        response.raise_for_status()
+        logging.info(f"Alert sent ({kind}): {title} - {detail}")
+        return True
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Error sending alert '{title}': {e}")
+        return False
+
+
+class AlertSender(NotificationSink):
+    """Delivers alert messages on a background thread so a slow webhook never stalls polling.
+
+    Unlike status snapshots, alerts are never dropped in favour of newer ones;
+    if the queue is full the alert is left unsent and retried next cycle.
+    """
+
+    def __init__(self, webhook_url, queue_size=64):
+        super().__init__("alerts", queue_size)
+        self.webhook_url = webhook_url
+
+    def submit(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            record_alert_delivery(event[3], event[0], False)
+
+    def deliver(self, event):
+        kind, title, detail, key = event
+        delivered = False
+        try:
+            delivered = send_alert_message(self.webhook_url, kind, title, detail)
+        finally:
+            record_alert_delivery(key, kind, delivered)
+
+
+# --- Webhook Receiver ---
+# Services that can push events to the monitor instead of only being polled
+WEBHOOK_SERVICES = ("radarr", "sonarr", "overseerr")
+# Services whose webhooks only invalidate cached data; they are still polled every cycle
+WEBHOOK_NOTIFY_SERVICES = ("plex",)
+PLEX_LIBRARY_EVENTS = ("library.new",)
+WEBHOOK_MAX_BODY = 1024 * 1024
+
+def _adjust_count(service, field, delta):
+    """Applies an incremental change to a cached count. Returns False if it can't be applied."""
+    data = current_statuses.get(service)
+    if not data or data.get('status') != "Online" or not isinstance(data.get(field), int):
+        return False
+    current_statuses[service] = data._replace(**{field: max(0, data[field] + delta)})
+    return True
+
+def apply_webhook_event(service, payload):
+    """Updates the cached status for a service from a pushed webhook payload.
+
+    Returns True when the cached status changed. Events that can't be applied
+    incrementally (e.g. the service was last seen offline) mark the service to be
+    polled on the next cycle instead. Plex library events mark the library
+    section for a recount on the next cycle.
+    """
+    with status_lock:
+        if service == "plex":
+            event = payload.get('event')
+            if event in PLEX_LIBRARY_EVENTS:
+                section = (payload.get('Metadata') or {}).get('librarySectionID')
+                # Picked up by get_plex_library_stats, or sent to the polling worker that owns Plex
+                plex_library_stale.add(str(section) if section is not None else None)
+                logging.debug(f"Plex webhook '{event}': library section {section or '(all)'} will be recounted.")
+            return False
+        if service in ("radarr", "sonarr"):
+            event = payload.get('eventType')
+            if event == "Grab":
+                changed = _adjust_count(service, "queue_count", 1)
+            elif event == "Download":
+                changed = _adjust_count(service, "queue_count", -1)
+            elif event in ("Health", "HealthRestored"):
+                data = current_statuses.get(service)
+                changed = data is not None
+                if changed:
+                    current_statuses[service] = data._replace(health=payload.get('message') if event == "Health" else None)
+            elif event == "Test":
+                logging.info(f"Received test webhook from {service.capitalize()}.")
+                return False
+            else:
+                logging.debug(f"Ignoring {service.capitalize()} webhook event '{event}'.")
+                return False
+        else:
+            notification = payload.get('notification_type')
+            if notification == "MEDIA_PENDING":
+                changed = _adjust_count(service, "pending_requests", 1)
+            elif notification in ("MEDIA_APPROVED", "MEDIA_DECLINED"):
+                changed = _adjust_count(service, "pending_requests", -1)
+            elif notification == "TEST_NOTIFICATION":
+                logging.info("Received test webhook from Overseerr.")
+                return False
+            else:
+                logging.debug(f"Ignoring Overseerr webhook event '{notification}'.")
+                return False
+
+        if not changed:
+            pending_reconcile.add(service)
+            return False
+    logging.info(f"Applied {service.capitalize()} webhook event.")
+    return True
+
+
+def _parse_webhook_body(content_type, body):
+    """Returns a webhook's JSON payload. Plex posts it as the "payload" field of a multipart form."""
+    if content_type.startswith('multipart/form-data'):
+        # Only Plex posts multipart bodies
+        import email.parser
+        import email.policy
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode('utf-8') + body)
+        for part in message.iter_parts():
+            if part.get_param('name', header='content-disposition') == 'payload':
+                return json.loads(part.get_content())
+        raise ValueError("multipart webhook without a payload field")
+    return json.loads(body or b'{}')
+
+
+class WebhookRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Accepts POSTs to /webhook/<service> from Radarr, Sonarr, Overseerr and Plex."""
+
+    server_version = "PlexMonitor"
+
+    def _authorized(self):
+        secret = self.server.secret
+        candidates = [self.headers.get('X-Webhook-Secret', '')]
+        authorization = self.headers.get('Authorization', '')
+        if authorization.startswith('Basic '):
+            # Radarr/Sonarr webhooks support a username/password; the password is the secret
+            try:
+                candidates.append(base64.b64decode(authorization[6:]).decode('utf-8').partition(':')[2])
+            except ValueError:
+                pass
+        elif authorization.startswith('Bearer '):
+            candidates.append(authorization[7:])
+        else:
+            candidates.append(authorization) # Overseerr sends the configured header value as is
+        return any(candidate and hmac.compare_digest(candidate.encode(), secret.encode()) for candidate in candidates)
+
+    def _respond(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path.split('?')[0].rstrip('/') == '/admin/diagnostics':
+            return self._handle_diagnostics()
+        service = self.path.split('?')[0].rstrip('/').rpartition('/webhook/')[2]
+        if service not in WEBHOOK_SERVICES + WEBHOOK_NOTIFY_SERVICES:
+            return self._respond(404)
+        if not self._authorized():
+            logging.warning(f"Rejected {service} webhook from {self.client_address[0]}: bad or missing secret.")
+            return self._respond(401)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if not 0 <= length <= WEBHOOK_MAX_BODY:
+                # rfile.read(-1) would wait for the client to close the connection
+                return self._respond(413 if length > 0 else 400)
+            payload = _parse_webhook_body(self.headers.get('Content-Type', ''), self.rfile.read(length))
+        except ValueError:
+            return self._respond(400)
+        if apply_webhook_event(service, payload):
+            refresh_event.set()
+        self._respond(204)
+
+    def _handle_diagnostics(self):
+        """Toggles a diagnostics capture; only accepted from this host."""
+        if self.client_address[0] not in ('127.0.0.1', '::1'):
+            return self._respond(403)
+        if not self._authorized():
+            return self._respond(401)
+        request_diagnostics()
+        self._respond(202)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Webhook receiver: {format % args}")
+
+
+def start_webhook_receiver(webhooks_config):
+    """Starts the embedded webhook listener on a background thread. Returns the server or None."""
+    secret = webhooks_config.get('secret')
+    if not secret:
+        logging.error("Webhook receiver enabled but no 'secret' is configured; not starting it.")
+        return None
+    host = webhooks_config.get('host', '0.0.0.0')
+    port = webhooks_config.get('port', 8765)
+    try:
+        server = http.server.ThreadingHTTPServer((host, port), WebhookRequestHandler)
+    except OSError as e:
+        logging.error(f"Could not start webhook receiver on {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    server.secret = secret
+    threading.Thread(target=server.serve_forever, name="webhook-receiver", daemon=True).start()
+    logging.info(f"Webhook receiver listening on {host}:{port}")
+    return server
+
+
+# --- Diagnostics ---
+def request_diagnostics(signum=None, frame=None):
+    """Asks the main loop to start (or end early) a diagnostics capture.
+
+    Safe to use as a signal handler: the actual work happens at the next cycle boundary.
+    """
+    diagnostics_requested.set()
+
+def collect_runtime_stats(dispatcher=None):
+    """Gathers thread, connection pool and cache sizes for a diagnostics report."""
+    stats = {
+        "threads": sorted(thread.name for thread in threading.enumerate()),
+        "gc_counts": gc.get_count(),
+        "gc_tracked_objects": len(gc.get_objects()),
+        "response_cache_entries": len(response_cache),
+        "current_statuses": len(current_statuses),
+        "alert_states": len(alert_states),
+        "sabnzbd_history_jobs": sum(len(state["jobs"]) for state in sabnzbd_history_state.values()),
+        "qbittorrent_synced_torrents": sum(len(state["torrents"]) for state in qbittorrent_sync_state.values()),
+        "pipeline_rows": len(pipeline_state["rows"]),
+        "pipeline_torrent_index": len(pipeline_state["torrents"]),
+        "timeouts": {service: service_timeout(service) for service in latency_history},
+    }
+    if http_session is not None:
+        pools = {}
+        for prefix, adapter in http_session.adapters.items():
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools[key]
+                pools[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                    "connections_opened": pool.num_connections,
+                    "free_slots": pool.pool.qsize() if pool.pool else 0,
+                }
+        stats["http_pools"] = pools
+    suppressed = [log_filter for handler in logging.getLogger().handlers for log_filter in handler.filters
+                  if isinstance(log_filter, RepeatSuppressFilter)]
+    if suppressed:
+        stats["log_suppression_entries"] = len(suppressed[0].seen)
+    if dispatcher is not None:
+        stats["sinks"] = {sink.name: {"queued": sink.queue.qsize(), "dropped": sink.dropped} for sink in dispatcher.sinks}
+    if resource:
+        stats["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return stats
+
+def write_diagnostics_report(directory, profiler, dispatcher=None):
+    """Writes profiler, allocation and runtime stats to a timestamped file. Returns its path."""
+    path = os.path.join(directory, f"plex_monitor_diagnostics_{time.strftime('%Y%m%d-%H%M%S')}.txt")
+    import pstats
+    import tracemalloc
+    with open(path, 'w') as f:
+        f.write("=== Runtime ===\n")
+        f.write(json.dumps(collect_runtime_stats(dispatcher), indent=2, default=str) + "\n")
+
+        if profiler is not None:
+            f.write("\n=== Profile (top 40 by cumulative time) ===\n")
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(40)
+            f.write(stream.getvalue())
+
+        if tracemalloc.is_tracing():
+            f.write("\n=== Top allocations (tracemalloc) ===\n")
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            for stat in snapshot.statistics('lineno')[:25]:
+                f.write(f"{stat}\n")
+    return path
+
+def diagnostics_begin_cycle(diagnostics_config, dispatcher=None):
+    """Starts or stops a capture if one was requested, and resumes profiling for this cycle."""
+    state = diagnostics_state
+    if diagnostics_requested.is_set():
+        diagnostics_requested.clear()
+        if state["profiler"] is not None:
+            logging.info("Diagnostics requested again; ending the current capture early.")
+            state["cycles_left"] = 0
+            _finish_diagnostics(diagnostics_config, dispatcher)
+        else:
+            # Only imported once a capture is requested
+            import cProfile
+            import tracemalloc
+            state["profiler"] = cProfile.Profile()
+            state["cycles_left"] = diagnostics_config.get('profile_cycles', 5)
+            state["started_tracemalloc"] = not tracemalloc.is_tracing()
+            if state["started_tracemalloc"]:
+                tracemalloc.start(diagnostics_config.get('tracemalloc_frames', 10))
+            logging.info(f"Diagnostics capture started for the next {state['cycles_left']} cycles.")
+    if state["profiler"] is not None:
+        state["profiler"].enable()
+
+def diagnostics_end_cycle(diagnostics_config, dispatcher=None):
+    """Pauses profiling while the loop waits, and writes the report once the capture is done."""
+    state = diagnostics_state
+    if state["profiler"] is None:
+        return
+    state["profiler"].disable()
+    state["cycles_left"] -= 1
+    if state["cycles_left"] <= 0:
+        _finish_diagnostics(diagnostics_config, dispatcher)
+
+def _finish_diagnostics(diagnostics_config, dispatcher):
+    state = diagnostics_state
+    directory = diagnostics_config.get('directory') or os.path.dirname(os.path.abspath(LOG_FILE))
+    try:
+        path = write_diagnostics_report(directory, state["profiler"], dispatcher)
+        logging.info(f"Diagnostics report written to {path}")
+    except OSError as e:
+        logging.error(f"Could not write diagnostics report: {e}")
+    finally:
+        if state["started_tracemalloc"]:
+            import tracemalloc
+            tracemalloc.stop()
+        state["profiler"] = None
+        state["started_tracemalloc"] = False
+
+
+# --- High Availability ---
+class LeaderLock:
+    """Leader election through an exclusive lock on a shared lock file.
+
+    The lock is held for as long as the leader process lives; the OS releases it
+    when the process exits or dies, letting a standby take over on its next check.
+    """
+
+    def __init__(self, lock_path):
+        self.lock_path = lock_path
+        self.lock_file = None
+
+    @property
+    def is_leader(self):
+        return self.lock_file is not None
+
+    def try_acquire(self):
+        """Attempts to become leader without blocking. Returns True on success."""
+        if self.lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Record who holds the lock to make debugging a pair of replicas easier
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{socket.gethostname()}:{os.getpid()}\n")
+        lock_file.flush()
+        self.lock_file = lock_file
+        return True
+
+    def release(self):
+        if self.lock_file is not None:
+            try:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            finally:
+                self.lock_file.close()
+                self.lock_file = None
+
+
+def save_ha_snapshot(path, statuses, dispatcher):
+    """Atomically writes the leader's latest state for standbys to pick up."""
+    snapshot = {
+        "timestamp": time.time(),
+        "leader": f"{socket.gethostname()}:{os.getpid()}",
+        "statuses": {service: data._asdict() for service, data in statuses.items()},
+        "previous_service_states": previous_service_states,
+        "alert_states": alert_states,
+        "sinks": dispatcher.export_state(),
+    }
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, 'w') as f, alert_lock:
+            json.dump(snapshot, f, default=str)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.error(f"Error writing HA snapshot '{path}': {e}")
+
+def load_ha_snapshot(path):
+    """Reads the shared HA snapshot. Returns None if it is missing or unreadable."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Error reading HA snapshot '{path}': {e}")
+        return None
+
+def restore_ha_snapshot(snapshot, dispatcher):
+    """Applies a snapshot taken by the previous leader to this replica."""
+    if not snapshot:
+        return
+    dispatcher.restore_state(snapshot.get('sinks', {}))
+    # Carry over the last known service states and alerts, so rules neither repeat an
+    # alert the previous leader already sent nor forget to resolve it
+    previous_service_states.update(snapshot.get('previous_service_states', {}))
+    with alert_lock:
+        for key, state in snapshot.get('alert_states', {}).items():
+            # Messages the previous leader still had in flight are unknown; send them again if needed
+            alert_states[key] = dict(state, sending=None)
+    # Start from the previous leader's statuses, so the board stays complete until every service is polled
+    with status_lock:
+        for service, data in snapshot.get('statuses', {}).items():
+            record = STATUS_RECORDS.get(service)
+            if record and service not in current_statuses:
+                current_statuses[service] = record(**{field: value for field, value in data.items() if field in record._fields})
+    logging.info(f"Restored state from HA snapshot written by {snapshot.get('leader', 'unknown')}.")
+
+def build_leader_lock(config):
+    """Returns a LeaderLock when HA mode is enabled, otherwise None."""
+    ha_config = config.get('ha', {})
+    if not ha_config.get('enabled', False):
+        return None
+    if fcntl is None:
+        logging.warning("HA mode requires file locking (fcntl), which is unavailable on this platform. Running as a single instance.")
+        return None
+    config_dir = os.path.dirname(os.path.abspath(CONFIG_FILE))
+    return LeaderLock(ha_config.get('lock_path') or os.path.join(config_dir, 'plex_monitor.lock'))
+
+
+# --- Scheduler ---
+TRIGGER_FILE_POLL_SECONDS = 1
+
+def request_shutdown(signum=None, frame=None, timeout=8):
+    """Signal handler for SIGTERM/SIGINT: finish the probe in flight, flush sinks and state, then exit.
+
+    A watchdog ends the process if that takes longer than `timeout` seconds. The
+    probe in flight gets half of that: its remaining requests are held to the cycle
+    deadline, so the other half is left for the sinks, HA snapshot and capture.
+    """
+    global shutdown_deadline, cycle_deadline
+    if shutdown_event.is_set():
+        return
+    reason = signal.Signals(signum).name if signum else "Shutdown requested"
+    logging.info(f"{reason}: shutting down (at most {timeout}s).")
+    shutdown_deadline = time.time() + timeout
+    probe_deadline = time.perf_counter() + timeout / 2
+    cycle_deadline = probe_deadline if cycle_deadline is None else min(cycle_deadline, probe_deadline)
+    shutdown_event.set()
+    refresh_event.set()
+    watchdog = threading.Timer(timeout, _force_exit, args=(timeout,))
+    watchdog.daemon = True
+    watchdog.start()
+
+def _force_exit(timeout):
+    logging.critical(f"Shutdown did not finish within {timeout}s; exiting now.")
+    os._exit(1)
+
+def request_refresh(signum=None, frame=None):
+    """Signal handler for SIGHUP: start a full cycle now instead of waiting for the interval."""
+    poll_now_event.set()
+    refresh_event.set()
+
+def consume_trigger_file(path):
+    """Returns True, removing the file, if a refresh was requested by creating `path`."""
+    if not path or not os.path.exists(path):
+        return False
+    try:
+        os.remove(path)
+    except OSError as e:
+        logging.warning(f"Could not remove trigger file '{path}': {e}")
+        return False
+    return True
+
+def wait_for_next_cycle(next_cycle, trigger_file=None):
+    """Waits until the next cycle is due or something wakes the loop earlier.
+
+    Returns "shutdown", "refresh" (SIGHUP or the trigger file), "webhook" (pushed
+    events changed a cached status) or "timer".
+    """
+    while True:
+        if shutdown_event.is_set():
+            return "shutdown"
+        if poll_now_event.is_set() or consume_trigger_file(trigger_file):
+            poll_now_event.clear()
+            return "refresh"
+        remaining = next_cycle - time.time()
+        if remaining <= 0:
+            return "timer"
+        if refresh_event.wait(min(remaining, TRIGGER_FILE_POLL_SECONDS) if trigger_file else remaining):
+            refresh_event.clear()
+            if not (shutdown_event.is_set() or poll_now_event.is_set()):
+                return "webhook"
+
+
 # --- Main Loop ---
+def publish_statuses(statuses, dispatcher, alerts_config, alert_sender):
+    """Runs alert rules on a statuses snapshot and hands it to the sinks."""
+    if pipeline_config.get('enabled'):
+        statuses["pipeline"] = update_pipeline(statuses)
+        # The raw join inputs can hold every torrent and queue item; keep them out of the sinks and the HA snapshot
+        for service, fields in PIPELINE_INPUT_FIELDS.items():
+            if statuses.get(service) is not None:
+                statuses[service] = statuses[service]._replace(**dict.fromkeys(fields))
+
+    if alerts_config:
+        for event in evaluate_alerts(alerts_config, statuses):
+            alert_sender.submit(event)
+
+    message_data = format_discord_message(statuses)
+    dispatcher.publish(statuses, message_data)
+
 def main():
     """Main execution function."""
-    global discord_message_id
     config = load_config()
     if not config:
         return # Stop if config failed to load
+    setup_logging(config)
+    configure_runtime(config)
+    start_transport(config.get('transport', {}))
 
     webhook_url = config.get('discord_webhook_url')
     update_interval = config.get('update_interval_seconds', 60) # Default to 60 seconds
-
-    while True:
-        logging.info("--- Starting status check cycle ---")
-        statuses = {
-            "plex": get_plex_status(config.get('services', {}).get('plex')),
-            "radarr": get_radarr_status(config.get('services', {}).get('radarr')),
-            "sonarr": get_sonarr_status(config.get('services', {}).get('sonarr')),
-            "sabnzbd": get_sabnzbd_status(config.get('services', {}).get('sabnzbd')),
-            "qbittorrent": get_qbittorrent_status(config.get('services', {}).get('qbittorrent')),
-            "tautulli": get_tautulli_status(config.get('services', {}).get('tautulli')),
-            "overseerr": get_overseerr_status(config.get('services', {}).get('overseerr')),
-        }
-
-        message_data = format_discord_message(statuses)
-
-        if discord_message_id:
-            logging.info(f"Attempting to update message ID: {discord_message_id}")
-            update_status = update_discord_message(webhook_url, discord_message_id, message_data)
-            if update_status == "send_new":
-                discord_message_id = None # Reset message ID as it's invalid
-                logging.info("Previous message not found, attempting to send a new one.")
-                send_discord_message(webhook_url, message_data)
-            elif not update_status:
-                 logging.warning("Failed to update Discord message. Will retry next cycle.")
-                 # Optionally: Implement logic to retry sending a new message after several failed updates
+    alerts_config = config.get('alerts', {})
+    if not alerts_config.get('enabled', False):
+        alerts_config = None
+    alert_sender = AlertSender((alerts_config or {}).get('webhook_url') or webhook_url)
+    alert_sender.start()
+
+    dispatcher = SinkDispatcher(build_sinks(config))
+    dispatcher.start()
+
+    diagnostics_config = config.get('diagnostics', {})
+    shutdown_timeout = config.get('shutdown_timeout_seconds', 8)
+    trigger_file = config.get('trigger_file', os.path.join(os.path.dirname(os.path.abspath(CONFIG_FILE)), 'plex_monitor.refresh'))
+    signal.signal(signal.SIGTERM, lambda signum, frame: request_shutdown(signum, frame, shutdown_timeout))
+    signal.signal(signal.SIGINT, lambda signum, frame: request_shutdown(signum, frame, shutdown_timeout))
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, request_refresh)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, request_diagnostics)
+
+    leader_lock = build_leader_lock(config)
+    ha_config = config.get('ha', {})
+    snapshot_path = ha_config.get('snapshot_path') or os.path.join(os.path.dirname(os.path.abspath(CONFIG_FILE)), 'plex_monitor_snapshot.json')
+    warm_snapshot = None
+    statuses = {}
+    startup_reported = False
+
+    # With the webhook receiver running, services listed under webhooks.services are only polled to reconcile
+    webhooks_config = config.get('webhooks', {})
+    receiver = start_webhook_receiver(webhooks_config) if webhooks_config.get('enabled', False) else None
+    push_services = set()
+    for service in webhooks_config.get('services', []) if receiver else []:
+        if service in WEBHOOK_SERVICES:
+            push_services.add(service)
         else:
-            logging.info("No existing message ID found, sending initial message.")
-            send_discord_message(webhook_url, message_data)
-
-        logging.info(f"--- Cycle complete. Waiting for {update_interval} seconds. ---")
-        time.sleep(update_interval)
+            logging.warning(f"webhooks.services: '{service}' can't push its status; it will keep being polled.")
+    reconcile_interval = webhooks_config.get('reconcile_interval_seconds', 900)
+    coalesce_seconds = webhooks_config.get('coalesce_seconds', 2)
+    last_reconcile = 0
+
+    worker_count = config.get('workers', 0)
+    if worker_count > 0 and transport_state:
+        logging.warning("Record/replay runs in the main process only; ignoring 'workers'.")
+        worker_count = 0
+    poller = ShardedPoller(config, worker_count, config.get('worker_timeout_seconds', 60)) if worker_count > 0 else None
+    if poller:
+        poller.start()
+    force_full_poll = False
+    try:
+        while not shutdown_event.is_set():
+            if leader_lock and not leader_lock.is_leader:
+                if not leader_lock.try_acquire():
+                    # Standby: keep the leader's latest state warm and check again next interval
+                    warm_snapshot = load_ha_snapshot(snapshot_path) or warm_snapshot
+                    logging.debug("Standby: another replica holds the leader lock.")
+                    shutdown_event.wait(ha_config.get('check_interval_seconds', update_interval))
+                    continue
+                logging.info("Acquired leader lock; this replica is now polling.")
+                restore_ha_snapshot(load_ha_snapshot(snapshot_path) or warm_snapshot, dispatcher)
+
+            logging.info("--- Starting status check cycle ---")
+            diagnostics_begin_cycle(diagnostics_config, dispatcher)
+            cycle_start = time.time()
+            with status_lock:
+                due = [service for service in SERVICE_PROBES if service not in push_services or service in pending_reconcile]
+                pending_reconcile.clear()
+            if force_full_poll or (push_services and cycle_start - last_reconcile >= reconcile_interval):
+                due = list(SERVICE_PROBES)
+                last_reconcile = cycle_start
+            polled = poller.poll(due) if poller else collect_statuses(config, due)
+            statuses = merge_polled_statuses(polled)
+
+            publish_statuses(statuses, dispatcher, alerts_config, alert_sender)
+            if not startup_reported:
+                log_startup_report()
+                startup_reported = True
+            if leader_lock:
+                save_ha_snapshot(snapshot_path, statuses, dispatcher)
+            diagnostics_end_cycle(diagnostics_config, dispatcher)
+
+            logging.info(f"--- Cycle complete. Waiting for {update_interval} seconds. ---")
+            next_cycle = cycle_start + update_interval
+            reason = wait_for_next_cycle(next_cycle, trigger_file)
+            while reason == "webhook":
+                # A webhook changed a cached status: wait briefly so a burst of events
+                # results in a single update, then republish without polling anything
+                if shutdown_event.wait(coalesce_seconds):
+                    break
+                refresh_event.clear()
+                with status_lock:
+                    statuses = {service: current_statuses[service] for service in SERVICE_PROBES if service in current_statuses}
+                logging.info("Publishing update from webhook events.")
+                publish_statuses(statuses, dispatcher, alerts_config, alert_sender)
+                reason = wait_for_next_cycle(next_cycle, trigger_file)
+            force_full_poll = reason == "refresh"
+            if force_full_poll:
+                logging.info("Refresh requested; starting a full cycle now.")
+    finally:
+        if receiver:
+            receiver.shutdown()
+        if poller:
+            poller.stop()
+        # Give sinks a chance to deliver the last snapshot (and any pending alerts) before exiting
+        dispatcher.stop(max(1, shutdown_deadline - time.time()) if shutdown_deadline else 10)
+        alert_sender.stop(max(1, shutdown_deadline - time.time()) if shutdown_deadline else 10)
+        if leader_lock and leader_lock.is_leader:
+            # Save once more so the next leader sees message IDs from the final delivery
+            save_ha_snapshot(snapshot_path, statuses, dispatcher)
+            leader_lock.release()
+        stop_transport()
+        if shutdown_event.is_set():
+            logging.info("Shutdown complete.")
+        stop_logging()
 
 if __name__ == "__main__":
     try:
         main()
-    except KeyboardInterrupt:
-        logging.info("Script interrupted by user. Exiting.")
     except Exception as e:
         logging.exception(f"An unhandled exception occurred: {e}")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Pre-flight check for Plex Monitor.
+This script probes every service configured in config.json at the same time and reports whether it is reachable,
+whether its credentials are accepted and how quickly it responds, along with suggested timeout and interval settings.
+It exits with a non-zero status if any configured service fails, so a bad config is caught before deploying it.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import socket
+import statistics
+import sys
+import time
+import urllib.parse
+
+import requests
+import urllib3
+
+DEFAULT_TIMEOUT = 3 # Seconds per connection attempt and response; short, so a dead host fails fast
+DEFAULT_SAMPLES = 3 # Authenticated requests timed per service
+
+# plex_monitor.py's adaptive timeout defaults; the config's "timeouts" section overrides them
+DEFAULT_TIMEOUT_SETTINGS = {"multiplier": 3.0, "connect_floor": 0.25, "connect_cap": 10.0, "read_floor": 0.75, "read_cap": 20.0}
+
+# Approximate requests each service's status check makes per cycle in plex_monitor.py
+REQUESTS_PER_CHECK = {"plex": 1, "radarr": 3, "sonarr": 3, "sabnzbd": 1, "qbittorrent": 4, "tautulli": 1, "overseerr": 1}
+MIN_UPDATE_INTERVAL = 30
+INTERVAL_HEADROOM = 4 # A full check should take at most a quarter of the update interval
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+def _is_configured(service, config):
+    """Returns True if the service has a URL that isn't the template placeholder."""
+    url = config.get('url') if isinstance(config, dict) else None
+    return bool(url) and f"YOUR_{service.upper()}_" not in url
+
+def _auth_request(service, config):
+    """Returns (method, url, request kwargs) for a cheap request that needs valid credentials.
+
+    URLs are built the same way plex_monitor.py builds them, so a URL that passes
+    here works for the monitor too.
+    """
+    url = config['url'].rstrip('/')
+    api_key = config.get('api_key', '')
+    if service == 'plex':
+        return 'GET', f"{url}/", {"headers": {"X-Plex-Token": config.get('token', ''), "Accept": "application/json"}}
+    if service in ('radarr', 'sonarr'):
+        return 'GET', f"{url}/api/v3/system/status", {"headers": {"X-Api-Key": api_key}}
+    if service == 'sabnzbd':
+        # limit=0 would return every queue slot
+        return 'GET', f"{url}/sabnzbd/api", {"params": {"mode": "queue", "limit": 1, "output": "json", "apikey": api_key}}
+    if service == 'qbittorrent':
+        return 'POST', f"{url}/api/v2/auth/login", {"data": {"username": config.get('username', ''), "password": config.get('password', '')}}
+    if service == 'tautulli':
+        return 'GET', f"{url}/api/v2", {"params": {"apikey": api_key, "cmd": "get_activity"}}
+    if service == 'overseerr':
+        return 'GET', f"{url}/api/v1/request", {"params": {"filter": "pending", "take": 1}, "headers": {"X-Api-Key": api_key}}
+    raise ValueError(f"Unknown service: {service}")
+
+def _auth_error(service, response):
+    """Returns why the credentials were rejected, or None if the response is a successful one."""
+    if response.status_code in (401, 403):
+        return "Unauthorized (check the token/API key)" if service != 'qbittorrent' else "Forbidden (too many failed logins?)"
+    if response.status_code >= 400:
+        return f"HTTP {response.status_code}"
+    if service == 'qbittorrent':
+        return None if response.text.strip() == 'Ok.' else "Login failed (check username/password)"
+    try:
+        data = response.json()
+    except ValueError:
+        return "Invalid response (not JSON). Check the URL"
+    if service == 'sabnzbd' and 'queue' not in data:
+        return f"Rejected: {data.get('error', 'check the API key')}" if isinstance(data, dict) else "Unexpected response"
+    if service == 'tautulli' and data.get('response', {}).get('result') != 'success':
+        return f"Rejected: {data.get('response', {}).get('message') or 'check the API key'}"
+    return None
+
+def probe_service(service, config, timeout=DEFAULT_TIMEOUT, samples=DEFAULT_SAMPLES):
+    """Checks that a service is reachable and accepts its credentials, timing each step.
+
+    The TCP connect is timed on its own, then `samples` authenticated requests are
+    made over one keep-alive session, the way the monitor reuses its connections.
+    Sampling stops at the first failure, so a bad password is only tried once.
+    """
+    result = {"service": service, "reachable": False, "authenticated": False,
+              "connect_ms": None, "latency_ms": [], "error": None}
+    parsed = urllib.parse.urlsplit(config['url'])
+    if not parsed.hostname:
+        result["error"] = f"Invalid URL: {config['url']}"
+        return result
+    try:
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    except ValueError:
+        result["error"] = f"Invalid port in URL: {config['url']}"
+        return result
+
+    start = time.perf_counter()
+    try:
+        socket.create_connection((parsed.hostname, port), timeout=timeout).close()
+    except socket.timeout:
+        result["error"] = f"No connection within {timeout}s"
+        return result
+    except OSError as e:
+        result["error"] = f"Connection failed ({e.strerror or e})"
+        return result
+    result["connect_ms"] = (time.perf_counter() - start) * 1000
+    result["reachable"] = True
+
+    method, url, kwargs = _auth_request(service, config)
+    with requests.Session() as session:
+        # Plex commonly uses its own plex.direct certificates, which the monitor doesn't verify either
+        session.verify = service != 'plex'
+        for _ in range(samples):
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=(timeout, timeout), **kwargs)
+            except requests.exceptions.Timeout:
+                result["error"] = f"No response within {timeout}s"
+                return result
+            except requests.exceptions.RequestException as e:
+                result["error"] = f"Request failed ({e.__class__.__name__})"
+                return result
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            result["error"] = _auth_error(service, response)
+            if result["error"]:
+                return result
+            result["authenticated"] = True
+            result["latency_ms"].append(elapsed_ms)
+    return result
+
+def suggested_timeout(result, timeouts=None):
+    """Returns a [connect, read] timeout for a healthy service, like the monitor would learn it.
+
+    `timeouts` is the config's "timeouts" section; missing settings use the monitor's defaults.
+    """
+    settings = dict(DEFAULT_TIMEOUT_SETTINGS, **(timeouts or {}))
+    connect = _clamp(result["connect_ms"] / 1000 * settings["multiplier"], settings["connect_floor"], settings["connect_cap"])
+    read = _clamp(max(result["latency_ms"]) / 1000 * settings["multiplier"], settings["read_floor"], settings["read_cap"])
+    return [round(connect, 2), round(read, 2)]
+
+def estimated_check_seconds(results):
+    """Estimates how long one monitor cycle takes to check every healthy service, using the slowest samples."""
+    return sum(max(result["latency_ms"]) / 1000 * REQUESTS_PER_CHECK.get(result["service"], 1)
+               for result in results if result["authenticated"])
+
+def suggested_update_interval(results):
+    """Returns the smallest update interval (a multiple of 15 seconds) that leaves headroom for a full check."""
+    seconds = estimated_check_seconds(results) * INTERVAL_HEADROOM
+    return max(MIN_UPDATE_INTERVAL, math.ceil(seconds / 15) * 15)
+
+def run_preflight(services, timeout=DEFAULT_TIMEOUT, samples=DEFAULT_SAMPLES):
+    """Probes the configured services concurrently and returns their results in config order."""
+    configured = [(service, config) for service, config in services.items() if _is_configured(service, config)]
+    if not configured:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(configured)) as executor:
+        futures = [executor.submit(probe_service, service, config, timeout, samples) for service, config in configured]
+        return [future.result() for future in futures]
+
+def print_report(results, update_interval, timeouts=None):
+    """Prints one line per service and the suggested settings."""
+    print(f"{'Service':<12} {'Reachable':<10} {'Auth':<6} {'Connect':>9} {'Latency (median/max)':>22}  Suggested timeout")
+    for result in results:
+        reachable = "yes" if result["reachable"] else "no"
+        connect = f"{result['connect_ms']:.0f} ms" if result["connect_ms"] is not None else "-"
+        if result["authenticated"]:
+            latency = f"{statistics.median(result['latency_ms']):.0f} / {max(result['latency_ms']):.0f} ms"
+            detail = json.dumps(suggested_timeout(result, timeouts))
+        else:
+            latency = "-"
+            detail = result["error"]
+        auth = "ok" if result["authenticated"] else ("fail" if result["reachable"] else "-")
+        print(f"{result['service']:<12} {reachable:<10} {auth:<6} {connect:>9} {latency:>22}  {detail}")
+
+    if not any(result["authenticated"] for result in results):
+        return
+    suggested = suggested_update_interval(results)
+    print(f"\nEstimated time to check all services: {estimated_check_seconds(results):.1f}s")
+    print(f"Suggested update_interval_seconds: {suggested} or more (currently {update_interval})")
+    if update_interval < suggested:
+        print("Warning: the current update interval leaves little room for slow responses.")
+    print("The monitor learns timeouts on its own; to pin one, add \"timeout\": [connect, read] to the service in config.json.")
+
+def preflight(config_path='config.json', timeout=DEFAULT_TIMEOUT, samples=DEFAULT_SAMPLES):
+    """Checks every service in a config file. Returns 0 if all of them passed, 1 otherwise."""
+    try:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: {config_path} not found. Please run setup_config.py to create a new config file.")
+        return 1
+    except json.JSONDecodeError:
+        print(f"Error: {config_path} is not valid JSON.")
+        return 1
+
+    # The report points out that Plex isn't verified; don't repeat it for every request
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    print(f"\n=== Checking services in {config_path} ===\n")
+    results = run_preflight(config.get('services', {}), timeout, samples)
+    if not results:
+        print("Error: no services are configured.")
+        return 1
+    print_report(results, config.get('update_interval_seconds', 60), config.get('timeouts'))
+
+    failed = [result["service"] for result in results if not result["authenticated"]]
+    if failed:
+        print(f"\nPre-flight failed for: {', '.join(failed)}")
+        return 1
+    print("\nAll configured services passed.")
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that every service in config.json is reachable and its credentials work.")
+    parser.add_argument('config', nargs='?', default=os.environ.get('CONFIG_PATH', 'config.json'),
+                        help="Config file to check (defaults to config.json)")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Seconds to wait for each connection and response (default {DEFAULT_TIMEOUT})")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES,
+                        help=f"Requests timed per service (default {DEFAULT_SAMPLES})")
+    args = parser.parse_args(argv)
+    return preflight(args.config, args.timeout, max(1, args.samples))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,8 @@ import os
 import sys
 import shutil
 
+from preflight_config import preflight
+
 def setup_config():
     """Create a config.json file from the template and guide the user through the configuration process."""
     # Check if config.json already exists
@@ -128,10 +130,18 @@ def setup_config():
         with open('config.json', 'w') as f:
             json.dump(config, f, indent=2)
         print("\nConfiguration saved to config.json")
-        return 0
     except Exception as e:
         print(f"Error saving config.json: {e}")
         return 1
+    
+    # Check the services before the monitor is deployed with this config
+    check = input("\nCheck the connection to each service now? (y/n): ")
+    if check.lower() == 'y':
+        result = preflight('config.json')
+        if result != 0:
+            print("Fix the services above in config.json, then run preflight_config.py again.")
+        return result
+    return 0
 
 if __name__ == '__main__':
     sys.exit(setup_config())
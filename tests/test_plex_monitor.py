@@ -1,8 +1,14 @@
 import unittest
+import gzip
 import json
 import os
 import sys
+import tempfile
+import tracemalloc
+import urllib.error
+import urllib.request
 from unittest.mock import patch, MagicMock
+from plexapi.exceptions import Unauthorized
 
 # Add parent directory to path to import plex_monitor
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -35,8 +41,7 @@ class TestPlexMonitor(unittest.TestCase):
         """Test get_plex_status when Plex is online."""
         # Set up the mock
         mock_plex = MagicMock()
-        mock_sessions = [MagicMock(), MagicMock()]  # Two mock sessions
-        mock_plex.sessions.return_value = mock_sessions
+        mock_plex.query.return_value.attrib = {"size": "2"}  # Two active sessions
         mock_plex_server.return_value = mock_plex
 
         # Call the function
@@ -46,13 +51,16 @@ class TestPlexMonitor(unittest.TestCase):
         self.assertEqual(result["status"], "Online")
         self.assertEqual(result["sessions"], 2)
         self.assertIsNone(result["error"])
+        mock_plex.query.assert_called_once_with('/status/sessions')
+        mock_plex.sessions.assert_not_called()
+        self.assertIsInstance(mock_plex_server.call_args.kwargs["session"], plex_monitor.ServiceSession)
 
     @patch('plex_monitor.requests.Session')
     @patch('plex_monitor.PlexServer')
     def test_get_plex_status_error(self, mock_plex_server, mock_session):
         """Test get_plex_status when Plex returns an error."""
         # Set up the mock to raise an exception
-        mock_plex_server.side_effect = plex_monitor.Unauthorized("Invalid token")
+        mock_plex_server.side_effect = Unauthorized("Invalid token")
 
         # Call the function
         result = plex_monitor.get_plex_status(self.mock_config["services"]["plex"])
@@ -62,8 +70,13 @@ class TestPlexMonitor(unittest.TestCase):
         self.assertEqual(result["sessions"], "N/A")
         self.assertEqual(result["error"], "Unauthorized")
 
+    @patch('plex_monitor.http_get_json', side_effect=lambda url, **kwargs: [
+        {"type": "ok", "message": ""},
+        {"type": "warning", "message": "Indexers unavailable"},
+        {"type": "error", "message": "Download client unavailable"},
+    ] if url.endswith('/health') else {"version": "3.0.0"})
     @patch('plex_monitor.RadarrAPI')
-    def test_get_radarr_status_online(self, mock_radarr_api):
+    def test_get_radarr_status_online(self, mock_radarr_api, mock_http_get_json):
         """Test get_radarr_status when Radarr is online."""
         # Set up the mock
         mock_radarr = MagicMock()
@@ -77,8 +90,733 @@ class TestPlexMonitor(unittest.TestCase):
         # Verify the result
         self.assertEqual(result["status"], "Online")
         self.assertEqual(result["queue_count"], 2)
+        # Open health issues are read on every poll, errors first
+        self.assertEqual(result["health"], "Download client unavailable (+1 more)")
         self.assertIsNone(result["error"])
 
+    @patch('plex_monitor.get_http_session')
+    def test_get_sabnzbd_status_limits_queue(self, mock_get_session):
+        """Test get_sabnzbd_status only asks Sabnzbd for a bounded number of slots."""
+        mock_get = mock_get_session.return_value.get
+        mock_response = MagicMock(status_code=200, headers={})
+        mock_response.json.return_value = {
+            "queue": {
+                "kbpersec": "2048",
+                "mb": "512",
+                "noofslots_total": 40,
+                "slots": [{"nzo_id": "SABnzbd_nzo_1", "filename": "Some.Show.S01E01", "percentage": "45", "timeleft": "0:10:00", "status": "Downloading"}]
+            }
+        }
+        mock_get.return_value = mock_response
+
+        result = plex_monitor.get_sabnzbd_status({"url": "http://localhost:8080/", "api_key": "key", "queue_limit": 1})
+
+        self.assertEqual(mock_get.call_args.kwargs["params"]["limit"], 1)
+        self.assertEqual(result["status"], "Online")
+        self.assertEqual(result["speed"], "2.0 MB/s")
+        self.assertEqual(result["jobs"], 40)
+        self.assertEqual(result["slots"][0]["nzo_id"], "SABnzbd_nzo_1")
+        self.assertIsNone(result.get("completed_last_hour"))
+
+    @patch('plex_monitor.get_http_session')
+    def test_get_sabnzbd_history_incremental(self, mock_get_session):
+        """Test get_sabnzbd_history counts recent jobs and passes last_history_update."""
+        mock_get = mock_get_session.return_value.get
+        now = int(plex_monitor.time.time())
+        first = MagicMock(status_code=200, headers={})
+        first.json.return_value = {"history": {"last_history_update": 5, "slots": [
+            {"nzo_id": "a", "completed": now - 60, "status": "Completed"},
+            {"nzo_id": "b", "completed": now - 120, "status": "Failed"},
+            {"nzo_id": "c", "completed": now - 7200, "status": "Completed"},
+        ]}}
+        unchanged = MagicMock(status_code=200, headers={})
+        unchanged.json.return_value = {"history": {"last_history_update": 5, "slots": []}}
+        mock_get.side_effect = [first, unchanged]
+
+        with patch.dict(plex_monitor.sabnzbd_history_state, clear=True):
+            self.assertEqual(plex_monitor.get_sabnzbd_history("http://sab/sabnzbd/api", "key", "http://sab"), (1, 1))
+            self.assertEqual(plex_monitor.get_sabnzbd_history("http://sab/sabnzbd/api", "key", "http://sab"), (1, 1))
+
+        self.assertEqual(mock_get.call_args_list[1].kwargs["params"]["last_history_update"], 5)
+
+    def test_evaluate_alerts_state_change(self):
+        """Test state rules fire on Online->Offline and resolve when the service recovers."""
+        alerts_config = {"rules": [{"name": "Plex down", "service": "plex", "type": "state", "from": "Online"}]}
+        online = {"plex": {"status": "Online", "sessions": 1, "error": None}}
+        offline = {"plex": {"status": "Offline", "sessions": "N/A", "error": "Connection failed"}}
+
+        with patch.dict(plex_monitor.alert_states, clear=True), patch.dict(plex_monitor.previous_service_states, clear=True):
+            self.assertEqual(plex_monitor.evaluate_alerts(alerts_config, online, now=0), [])
+            events = plex_monitor.evaluate_alerts(alerts_config, offline, now=60)
+            self.assertEqual([e[0] for e in events], ["fire"])
+            self.assertIn("Connection failed", events[0][2])
+            # The webhook failed: the alert is sent again next cycle
+            plex_monitor.record_alert_delivery("Plex down", "fire", False, now=60)
+            self.assertEqual([e[0] for e in plex_monitor.evaluate_alerts(alerts_config, offline, now=120)], ["fire"])
+            plex_monitor.record_alert_delivery("Plex down", "fire", True, now=120)
+            # Still down: no duplicate alert
+            self.assertEqual(plex_monitor.evaluate_alerts(alerts_config, offline, now=180), [])
+            self.assertEqual([e[0] for e in plex_monitor.evaluate_alerts(alerts_config, online, now=240)], ["resolve"])
+
+    def test_evaluate_alerts_defers_refire_until_cooldown_ends(self):
+        """Test a service that flaps and then stays down is announced once the cooldown has passed."""
+        alerts_config = {"cooldown_minutes": 30, "rules": [{"name": "Plex down", "service": "plex", "type": "state"}]}
+        online = {"plex": {"status": "Online", "sessions": 1, "error": None}}
+        offline = {"plex": {"status": "Offline", "sessions": "N/A", "error": "Connection failed"}}
+        def evaluate(statuses, now):
+            events = plex_monitor.evaluate_alerts(alerts_config, statuses, now=now)
+            for kind, _, _, key in events:
+                plex_monitor.record_alert_delivery(key, kind, True, now=now)
+            return [e[0] for e in events]
+
+        with patch.dict(plex_monitor.alert_states, clear=True), patch.dict(plex_monitor.previous_service_states, clear=True):
+            self.assertEqual(evaluate(offline, 0), ["fire"])
+            self.assertEqual(evaluate(online, 60), ["resolve"])
+            # Down again within the cooldown: held back, not dropped
+            self.assertEqual(evaluate(offline, 120), [])
+            self.assertEqual(evaluate(offline, 1200), [])
+            self.assertEqual(evaluate(offline, 1800), ["fire"])
+            self.assertEqual(evaluate(offline, 1860), [])
+            self.assertEqual(evaluate(online, 18000), ["resolve"])
+
+    def test_evaluate_alerts_threshold_hysteresis_and_cooldown(self):
+        """Test threshold rules honour for_minutes, clear_below and the cooldown."""
+        alerts_config = {"cooldown_minutes": 30, "rules": [
+            {"service": "sonarr", "type": "threshold", "field": "queue_count", "above": 50, "clear_below": 40, "for_minutes": 2}
+        ]}
+        def queue(count):
+            return {"sonarr": {"status": "Online", "queue_count": count, "error": None}}
+
+        with patch.dict(plex_monitor.alert_states, clear=True), patch.dict(plex_monitor.previous_service_states, clear=True):
+            self.assertEqual(plex_monitor.evaluate_alerts(alerts_config, queue(60), now=0), [])
+            self.assertEqual([e[0] for e in plex_monitor.evaluate_alerts(alerts_config, queue(60), now=120)], ["fire"])
+            plex_monitor.record_alert_delivery("sonarr:threshold:queue_count", "fire", True, now=120)
+            # Between clear_below and above: still active, nothing sent
+            self.assertEqual(plex_monitor.evaluate_alerts(alerts_config, queue(45), now=180), [])
+            self.assertEqual([e[0] for e in plex_monitor.evaluate_alerts(alerts_config, queue(10), now=240)], ["resolve"])
+            plex_monitor.record_alert_delivery("sonarr:threshold:queue_count", "resolve", True, now=240)
+            # Re-triggering inside the cooldown is not announced, nor is its resolution
+            plex_monitor.evaluate_alerts(alerts_config, queue(60), now=300)
+            self.assertEqual(plex_monitor.evaluate_alerts(alerts_config, queue(60), now=420), [])
+            self.assertEqual(plex_monitor.evaluate_alerts(alerts_config, queue(10), now=480), [])
+
+    @patch('plex_monitor.requests.patch')
+    @patch('plex_monitor.requests.post')
+    def test_discord_sink_sends_then_updates(self, mock_post, mock_patch):
+        """Test DiscordSink posts an initial message and edits it afterwards."""
+        mock_post.return_value.json.return_value = {"id": "123"}
+        sink = plex_monitor.DiscordSink("discord", "https://discord.com/api/webhooks/test")
+        snapshot = {"timestamp": 0, "statuses": {}, "discord": {"embeds": []}}
+
+        sink.deliver(snapshot)
+        sink.deliver(snapshot)
+
+        self.assertEqual(sink.message_id, "123")
+        mock_post.assert_called_once()
+        self.assertTrue(mock_patch.call_args.args[0].endswith("/messages/123"))
+
+    @patch('plex_monitor.requests.patch')
+    @patch('plex_monitor.requests.post')
+    def test_discord_sections_only_edit_changed_sections(self, mock_post, mock_patch):
+        """Test the sectioned dashboard posts one message per section and edits only the ones that changed."""
+        mock_post.return_value.json.side_effect = [{"id": "1"}, {"id": "2"}, {"id": "3"}]
+        sink = plex_monitor.DiscordSink("discord", "https://discord.com/api/webhooks/test", layout="sections")
+        statuses = {
+            "plex": plex_monitor.PlexStatus(status="Online", sessions=1, error=None),
+            "radarr": plex_monitor.ArrStatus(status="Online", queue_count=2, error=None),
+            "overseerr": plex_monitor.OverseerrStatus(status="Online", pending_requests=0, error=None),
+        }
+
+        sink.deliver({"timestamp": 0, "statuses": statuses})
+        self.assertEqual(sink.section_ids, {"streaming": "1", "downloads": "2", "requests": "3"})
+
+        # Nothing changed: no requests at all
+        sink.deliver({"timestamp": 60, "statuses": statuses})
+        mock_patch.assert_not_called()
+
+        statuses["radarr"] = statuses["radarr"]._replace(queue_count=3)
+        sink.deliver({"timestamp": 120, "statuses": statuses})
+        self.assertEqual(mock_post.call_count, 3)
+        mock_patch.assert_called_once()
+        self.assertTrue(mock_patch.call_args.args[0].endswith("/messages/2"))
+        self.assertIn("Queue: 3", mock_patch.call_args.kwargs["json"]["embeds"][0]["fields"][0]["value"])
+        self.assertEqual(sink.export_state()["section_ids"]["downloads"], "2")
+        self.assertIsNot(sink.export_state()["section_ids"], sink.section_ids)
+
+    def test_sink_dispatcher_fans_out_and_drops_stale_snapshots(self):
+        """Test every sink receives the latest snapshot and a busy sink never blocks publish."""
+        delivered = []
+        class RecordingSink(plex_monitor.NotificationSink):
+            def deliver(self, snapshot):
+                delivered.append((self.name, snapshot["statuses"]["cycle"]))
+
+        first, second = RecordingSink("first"), RecordingSink("second")
+        dispatcher = plex_monitor.SinkDispatcher([first, second])
+        # Not started yet, so the single-slot queues fill up: only the newest snapshot survives
+        for cycle in range(3):
+            dispatcher.publish({"cycle": cycle}, {})
+        self.assertEqual(first.dropped, 2)
+
+        dispatcher.start()
+        dispatcher.stop(timeout=5)
+        self.assertEqual(sorted(delivered), [("first", 2), ("second", 2)])
+
+    @unittest.skipIf(plex_monitor.fcntl is None, "fcntl is not available on this platform")
+    def test_leader_lock_single_leader(self):
+        """Test only one LeaderLock holds the lock and a standby takes over after release."""
+        with tempfile.TemporaryDirectory() as tmp:
+            lock_path = os.path.join(tmp, "plex_monitor.lock")
+            leader, standby = plex_monitor.LeaderLock(lock_path), plex_monitor.LeaderLock(lock_path)
+
+            self.assertTrue(leader.try_acquire())
+            self.assertFalse(standby.try_acquire())
+            leader.release()
+            self.assertTrue(standby.try_acquire())
+            standby.release()
+
+    def test_ha_snapshot_hands_over_discord_message(self):
+        """Test a new leader restores the previous leader's Discord message ID, alerts and statuses."""
+        alerts_config = {"rules": [{"name": "Plex down", "service": "plex", "type": "state"}]}
+        offline = {"plex": plex_monitor.PlexStatus(status="Offline", sessions="N/A", error="Connection failed")}
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_path = os.path.join(tmp, "snapshot.json")
+            old_sink = plex_monitor.DiscordSink("discord", "https://discord.com/api/webhooks/test")
+            old_sink.message_id = "456"
+            with patch.dict(plex_monitor.alert_states, clear=True), patch.dict(plex_monitor.previous_service_states, clear=True):
+                # The old leader announced that Plex is down
+                for kind, _, _, key in plex_monitor.evaluate_alerts(alerts_config, offline, now=0):
+                    plex_monitor.record_alert_delivery(key, kind, True, now=0)
+                plex_monitor.save_ha_snapshot(snapshot_path, offline, plex_monitor.SinkDispatcher([old_sink]))
+
+            new_sink = plex_monitor.DiscordSink("discord", "https://discord.com/api/webhooks/test")
+            with patch.dict(plex_monitor.alert_states, clear=True), patch.dict(plex_monitor.previous_service_states, clear=True), \
+                    patch.dict(plex_monitor.current_statuses, clear=True):
+                plex_monitor.restore_ha_snapshot(plex_monitor.load_ha_snapshot(snapshot_path), plex_monitor.SinkDispatcher([new_sink]))
+                self.assertEqual(plex_monitor.current_statuses["plex"], offline["plex"])
+                # No duplicate alert while Plex is still down, and the recovery is announced
+                self.assertEqual(plex_monitor.evaluate_alerts(alerts_config, offline, now=60), [])
+                online = {"plex": plex_monitor.PlexStatus(status="Online", sessions=0, error=None)}
+                self.assertEqual([e[0] for e in plex_monitor.evaluate_alerts(alerts_config, online, now=120)], ["resolve"])
+
+        self.assertEqual(new_sink.message_id, "456")
+
+    @unittest.skipUnless(plex_monitor.multiprocessing.get_start_method() == "fork", "needs fork so workers inherit the patched probes")
+    @patch('plex_monitor.get_radarr_status', return_value={"status": "Online", "queue_count": 3, "error": None})
+    @patch('plex_monitor.get_plex_status', side_effect=lambda config: {
+        "status": "Online", "sessions": 1, "stale": sorted(plex_monitor.plex_library_stale), "error": None})
+    def test_sharded_poller_merges_worker_results(self, mock_plex, mock_radarr):
+        """Test ShardedPoller spreads configured services over workers and merges them in display order."""
+        poller = plex_monitor.ShardedPoller(self.mock_config, worker_count=2, timeout=10)
+        self.assertEqual(poller.shards, [["plex"], ["radarr"]])
+
+        with patch.object(plex_monitor, 'plex_library_stale', set()):
+            poller.start()
+            try:
+                # A Plex library webhook received by the coordinator reaches the worker polling Plex
+                plex_monitor.apply_webhook_event("plex", {"event": "library.new", "Metadata": {"librarySectionID": 2}})
+                statuses = poller.poll()
+            finally:
+                poller.stop()
+            self.assertEqual(plex_monitor.plex_library_stale, set())
+
+        self.assertEqual(list(statuses), list(plex_monitor.SERVICE_PROBES))
+        self.assertEqual(statuses["plex"]["sessions"], 1)
+        self.assertEqual(statuses["plex"]["stale"], ["2"])
+        self.assertEqual(statuses["radarr"]["queue_count"], 3)
+        self.assertEqual(statuses["sonarr"]["error"], "Config missing")
+        # Configured services were polled in the workers, not the coordinator
+        mock_plex.assert_not_called()
+        mock_radarr.assert_not_called()
+
+    @unittest.skipUnless(plex_monitor.multiprocessing.get_start_method() == "fork", "needs fork so workers inherit the patched probes")
+    @patch('plex_monitor.get_radarr_status', side_effect=lambda config: plex_monitor.time.sleep(30))
+    @patch('plex_monitor.get_plex_status', return_value={"status": "Online", "sessions": 1, "error": None})
+    def test_sharded_poller_stops_waiting_on_shutdown(self, mock_plex, mock_radarr):
+        """Test a shutdown request stops the coordinator waiting for a busy worker."""
+        poller = plex_monitor.ShardedPoller(self.mock_config, worker_count=2, timeout=60)
+        with patch.object(plex_monitor, 'shutdown_event', plex_monitor.threading.Event()):
+            poller.start()
+            timer = plex_monitor.threading.Timer(0.5, plex_monitor.shutdown_event.set)
+            started = plex_monitor.time.monotonic()
+            timer.start()
+            try:
+                statuses = poller.poll()
+            finally:
+                poller.stop(timeout=0.5)
+                timer.cancel()
+
+        self.assertLess(plex_monitor.time.monotonic() - started, 5)
+        self.assertEqual(statuses["radarr"]["error"], "Skipped (shutting down)")
+        self.assertTrue(poller.stop_event.is_set())
+
+    def test_load_service_library_on_demand(self):
+        """Test client libraries are bound on first use without replacing existing names."""
+        stand_in = MagicMock()
+        with patch.multiple(plex_monitor, RadarrAPI=stand_in, SonarrAPI=None), \
+                patch.dict(plex_monitor.library_load_times, clear=True):
+            plex_monitor.load_service_library("pyarr")
+
+            self.assertIs(plex_monitor.RadarrAPI, stand_in)
+            self.assertEqual(plex_monitor.SonarrAPI.__name__, "SonarrAPI")
+            self.assertIn("pyarr", plex_monitor.library_load_times)
+
+    def test_repeat_suppress_filter_collapses_repeats(self):
+        """Test repeated errors are dropped inside the window and summarised afterwards."""
+        log_filter = plex_monitor.RepeatSuppressFilter(window=3600)
+        def record(message, created, level=plex_monitor.logging.ERROR):
+            entry = plex_monitor.logging.LogRecord("root", level, __file__, 1, message, None, None)
+            entry.created = created
+            return entry
+
+        self.assertTrue(log_filter.filter(record("Sonarr connection failed", 0)))
+        self.assertFalse(any(log_filter.filter(record("Sonarr connection failed", t)) for t in range(1, 240)))
+        self.assertTrue(log_filter.filter(record("Radarr connection failed", 10)))
+        # Below the suppression level everything passes
+        self.assertTrue(log_filter.filter(record("Attempting to connect", 20, plex_monitor.logging.INFO)))
+        self.assertTrue(log_filter.filter(record("Attempting to connect", 21, plex_monitor.logging.INFO)))
+
+        summary = record("Sonarr connection failed", 3600)
+        self.assertTrue(log_filter.filter(summary))
+        self.assertEqual(summary.getMessage(), "Sonarr connection failed (x240 in last 3600s)")
+
+    def test_json_log_formatter(self):
+        """Test JsonLogFormatter emits one parseable JSON object per record."""
+        entry = plex_monitor.logging.LogRecord("root", plex_monitor.logging.WARNING, __file__, 1, "Queue at %d", (5,), None)
+        output = json.loads(plex_monitor.JsonLogFormatter().format(entry))
+        self.assertEqual(output["level"], "WARNING")
+        self.assertEqual(output["message"], "Queue at 5")
+
+    @patch('plex_monitor.get_http_session')
+    def test_http_get_json_conditional_requests(self, mock_get_session):
+        """Test http_get_json revalidates with ETags and reuses the parsed body on 304."""
+        mock_get = mock_get_session.return_value.get
+        fresh = MagicMock(status_code=200, headers={"ETag": 'W/"abc"'})
+        fresh.json.return_value = {"pageInfo": {"results": 4}}
+        not_modified = MagicMock(status_code=304, headers={})
+        mock_get.side_effect = [fresh, not_modified]
+
+        with patch.dict(plex_monitor.response_cache, clear=True):
+            first = plex_monitor.http_get_json("http://overseerr/api/v1/request", headers={"X-Api-Key": "key"})
+            second = plex_monitor.http_get_json("http://overseerr/api/v1/request", headers={"X-Api-Key": "key"})
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_get.call_args.kwargs["headers"]["If-None-Match"], 'W/"abc"')
+        not_modified.json.assert_not_called()
+
+    @patch('plex_monitor.get_http_session')
+    def test_http_get_json_ttl_skips_request(self, mock_get_session):
+        """Test endpoints without validators are served from cache within their TTL."""
+        mock_get = mock_get_session.return_value.get
+        mock_get.return_value = MagicMock(status_code=200, headers={})
+        mock_get.return_value.json.return_value = {"version": "5.0"}
+
+        with patch.dict(plex_monitor.response_cache, clear=True):
+            plex_monitor.http_get_json("http://radarr/api/v3/system/status", ttl=300)
+            plex_monitor.http_get_json("http://radarr/api/v3/system/status", ttl=300)
+
+        mock_get.assert_called_once()
+
+    def test_apply_webhook_event_updates_cached_counts(self):
+        """Test pushed *arr and Overseerr events adjust the cached statuses incrementally."""
+        cached = {
+            "radarr": plex_monitor.ArrStatus(status="Online", queue_count=2, error=None),
+            "overseerr": plex_monitor.OverseerrStatus(status="Online", pending_requests=0, error=None),
+            "sonarr": plex_monitor.ArrStatus(status="Offline", queue_count="N/A", error="Connection failed"),
+        }
+        with patch.dict(plex_monitor.current_statuses, cached, clear=True), \
+                patch.object(plex_monitor, 'pending_reconcile', set()):
+            self.assertTrue(plex_monitor.apply_webhook_event("radarr", {"eventType": "Grab"}))
+            self.assertTrue(plex_monitor.apply_webhook_event("overseerr", {"notification_type": "MEDIA_PENDING"}))
+            self.assertFalse(plex_monitor.apply_webhook_event("radarr", {"eventType": "Test"}))
+            # Can't apply to a service last seen offline: poll it next cycle instead
+            self.assertFalse(plex_monitor.apply_webhook_event("sonarr", {"eventType": "Download"}))
+
+            self.assertEqual(plex_monitor.current_statuses["radarr"]["queue_count"], 3)
+            self.assertEqual(plex_monitor.current_statuses["overseerr"]["pending_requests"], 1)
+            self.assertEqual(plex_monitor.pending_reconcile, {"sonarr"})
+
+    def test_plex_library_stats_recount_only_changed_sections(self):
+        """Test library sections are recounted only when Plex marks them changed or a webhook invalidates them."""
+        import xml.etree.ElementTree as ElementTree
+        markers = {"1": "100", "2": "200"}
+        counts = {"1": 500, "2": 40}
+        plex = MagicMock()
+        def query(path, params=None):
+            if path == '/library/sections':
+                return ElementTree.fromstring('<MediaContainer>' + ''.join(
+                    f'<Directory key="{key}" title="Section {key}" updatedAt="{marker}" scannedAt="{marker}"/>'
+                    for key, marker in markers.items()) + '</MediaContainer>')
+            self.assertEqual(params, {'X-Plex-Container-Start': 0, 'X-Plex-Container-Size': 0})
+            return ElementTree.fromstring(f'<MediaContainer size="0" totalSize="{counts[path.split("/")[3]]}"/>')
+        plex.query.side_effect = query
+
+        with patch.dict(plex_monitor.plex_library_state, clear=True), patch.object(plex_monitor, 'plex_library_stale', set()):
+            stats = plex_monitor.get_plex_library_stats(plex, "http://plex", ttl=3600, now=1000)
+            self.assertEqual(stats, (("Section 1", 500, 0), ("Section 2", 40, 0)))
+            self.assertEqual(plex.query.call_count, 3)
+
+            # Unchanged sections reuse their cached counts
+            plex.query.reset_mock()
+            plex_monitor.get_plex_library_stats(plex, "http://plex", ttl=3600, now=1060)
+            self.assertEqual(plex.query.call_count, 1)
+
+            # A scan only recounts the section that changed
+            markers["1"], counts["1"] = "160", 503
+            plex.query.reset_mock()
+            stats = plex_monitor.get_plex_library_stats(plex, "http://plex", ttl=3600, now=1120)
+            self.assertEqual(plex.query.call_count, 2)
+            self.assertEqual(stats[0], ("Section 1", 503, 3))
+
+            # Plex's library.new webhook invalidates the section it names
+            counts["2"] = 41
+            self.assertFalse(plex_monitor.apply_webhook_event("plex", {"event": "library.new", "Metadata": {"librarySectionID": 2}}))
+            plex.query.reset_mock()
+            stats = plex_monitor.get_plex_library_stats(plex, "http://plex", ttl=3600, now=1180)
+            self.assertEqual(plex.query.call_count, 2)
+            self.assertEqual(stats[1], ("Section 2", 41, 1))
+            # On Deck updates aren't library changes
+            self.assertFalse(plex_monitor.apply_webhook_event("plex", {"event": "library.on.deck", "Metadata": {"librarySectionID": 2}}))
+            self.assertEqual(plex_monitor.plex_library_stale, set())
+
+            # Growth covers the last 24 hours: section 1 grew 24h+ ago, section 2 within the window
+            later = plex_monitor.get_plex_library_stats(plex, "http://plex", ttl=3600, now=1150 + 86400)
+            self.assertEqual(later, (("Section 1", 503, 0), ("Section 2", 41, 1)))
+
+        fields = plex_monitor.format_discord_message({"plex": plex_monitor.PlexStatus(status="Online", sessions=0, library=stats, error=None)})["embeds"][0]["fields"]
+        self.assertIn("▸ Section 1: 503 (+3)", fields[0]["value"])
+
+    def test_parse_webhook_body_reads_plex_multipart(self):
+        """Test Plex's multipart/form-data webhook payload is decoded like a JSON body."""
+        body = (b'--xyz\r\nContent-Disposition: form-data; name="payload"\r\nContent-Type: application/json\r\n\r\n'
+                b'{"event": "library.new"}\r\n--xyz\r\nContent-Disposition: form-data; name="thumb"; filename="t.jpg"\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n\xff\xd8\r\n--xyz--\r\n')
+        self.assertEqual(plex_monitor._parse_webhook_body('multipart/form-data; boundary=xyz', body), {"event": "library.new"})
+        self.assertEqual(plex_monitor._parse_webhook_body('application/json', b'{"eventType": "Grab"}'), {"eventType": "Grab"})
+        with self.assertRaises(ValueError):
+            plex_monitor._parse_webhook_body('multipart/form-data; boundary=xyz', b'--xyz--\r\n')
+
+    def test_webhook_receiver_requires_secret(self):
+        """Test the webhook receiver rejects unauthenticated posts and accepts the shared secret."""
+        server = plex_monitor.start_webhook_receiver({"secret": "s3cret", "host": "127.0.0.1", "port": 0})
+        self.assertIsNotNone(server)
+        url = f"http://127.0.0.1:{server.server_address[1]}/webhook/radarr"
+        def post(headers):
+            request = urllib.request.Request(url, data=b'{"eventType": "Grab"}', headers=headers, method="POST")
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        try:
+            with patch.dict(plex_monitor.current_statuses, {"radarr": plex_monitor.ArrStatus(status="Online", queue_count=0, error=None)}, clear=True), \
+                    patch.object(plex_monitor, 'refresh_event', plex_monitor.threading.Event()):
+                self.assertEqual(post({"Authorization": "wrong"}), 401)
+                self.assertEqual(post({"Authorization": "s3cret", "Content-Length": "abc"}), 400)
+                self.assertEqual(post({"Authorization": "s3cret", "Content-Length": "-1"}), 400)
+                self.assertEqual(post({"Authorization": "s3cret", "Content-Length": str(plex_monitor.WEBHOOK_MAX_BODY + 1)}), 413)
+                self.assertEqual(post({"Authorization": "s3cret"}), 204)
+                self.assertTrue(plex_monitor.refresh_event.is_set())
+                self.assertEqual(plex_monitor.current_statuses["radarr"]["queue_count"], 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_sync_qbittorrent_torrents_merges_partial_updates(self):
+        """Test the qBittorrent sync delta carries complete tuples for changed torrents only."""
+        client = MagicMock()
+        client.sync_maindata.side_effect = [
+            {"rid": 1, "full_update": True, "torrents": {
+                "abc": {"name": "Movie", "progress": 0.5, "dlspeed": 100, "eta": 60, "state": "downloading", "ratio": 0},
+                "def": {"name": "Other", "progress": 1, "dlspeed": 0, "eta": 0, "state": "uploading"}}},
+            {"rid": 2, "torrents": {"abc": {"dlspeed": 0, "state": "stalledDL"}, "ghi": {"upspeed": 500, "ratio": 1.2}},
+             "torrents_removed": ["def"]},
+        ]
+        sync_state = {"client": None, "rid": 0, "torrents": {}}
+
+        first = plex_monitor._sync_qbittorrent_torrents(client, sync_state)
+        second = plex_monitor._sync_qbittorrent_torrents(client, sync_state)
+
+        self.assertTrue(first["full"])
+        self.assertEqual(set(first["changed"]), {"ABC", "DEF"})
+        self.assertFalse(second["full"])
+        self.assertEqual(second["changed"], {"ABC": ("Movie", 50.0, 0, 60, "stalledDL")})
+        self.assertEqual(second["removed"], ["DEF"])
+        self.assertEqual(client.sync_maindata.call_args.kwargs["rid"], 1)
+
+    def test_publish_statuses_keeps_pipeline_inputs_out_of_sinks(self):
+        """Test the raw queue items and torrent delta are joined but not published."""
+        statuses = {
+            "radarr": plex_monitor.ArrStatus(status="Online", queue_count=1, queue_items=[("ABC", "Movie", 1000, 500)]),
+            "qbittorrent": plex_monitor.QbittorrentStatus(status="Online", torrent_delta={
+                "full": True, "changed": {"ABC": ("Movie", 50.0, 100, 60, "downloading")}, "removed": []}),
+        }
+        dispatcher = MagicMock()
+        fresh_state = {"torrents": {}, "sab_slots": {}, "rows": {}, "inputs": {}, "zero_speed_since": {}}
+        with patch.dict(plex_monitor.pipeline_state, fresh_state), \
+                patch.dict(plex_monitor.pipeline_config, {"enabled": True}):
+            plex_monitor.publish_statuses(statuses, dispatcher, None, None)
+
+        published = dispatcher.publish.call_args.args[0]
+        self.assertEqual(published["pipeline"]["items"], 1)
+        self.assertIsNone(published["radarr"].queue_items)
+        self.assertIsNone(published["qbittorrent"].torrent_delta)
+        self.assertNotIn("ABC", plex_monitor._snapshot_json({"timestamp": 0, "statuses": published}))
+
+    def test_update_pipeline_joins_and_flags_stalled(self):
+        """Test *arr queue items are joined to download clients and stalled items are flagged."""
+        statuses = {
+            "radarr": {"status": "Online", "queue_items": [("ABC", "Movie", 1000, 500)]},
+            "sonarr": {"status": "Online", "queue_items": [("SABNZBD_NZO_1", "Show", 1000, 100), ("XYZ", "Lost", 1000, 1000)]},
+            "qbittorrent": {"status": "Online", "torrent_delta": {"full": True, "changed": {"ABC": ("Movie", 50.0, 0, 8640000, "stalledDL")}, "removed": []}},
+            "sabnzbd": {"status": "Online", "pipeline_slots": {"SABNZBD_NZO_1": ("Show", 90.0, 2048, 30, True)}},
+        }
+        fresh_state = {"torrents": {}, "sab_slots": {}, "rows": {}, "inputs": {}, "zero_speed_since": {}}
+        with patch.dict(plex_monitor.pipeline_state, fresh_state), \
+                patch.dict(plex_monitor.pipeline_config, {"stall_minutes": 10}):
+            summary = plex_monitor.update_pipeline(statuses, now=0)
+            self.assertEqual((summary["items"], summary["stalled"]), (3, 0))
+            rows = plex_monitor.pipeline_state["rows"]
+            self.assertEqual(rows["SABNZBD_NZO_1"][2:5], ("Sabnzbd", 90.0, 2048))
+            self.assertEqual(rows["XYZ"][2], "Unknown")
+
+            # Nothing changed: no rows are rebuilt, but the stalled torrent is now flagged
+            with patch('plex_monitor._build_pipeline_row') as mock_build:
+                summary = plex_monitor.update_pipeline(statuses, now=600)
+                mock_build.assert_not_called()
+            self.assertEqual(summary["stalled_items"], [("Movie", "qBittorrent", 50.0)])
+
+            # The torrent picks up speed again
+            statuses["qbittorrent"]["torrent_delta"] = {"full": False, "changed": {"ABC": ("Movie", 55.0, 500, 100, "downloading")}, "removed": []}
+            self.assertEqual(plex_monitor.update_pipeline(statuses, now=660)["stalled"], 0)
+
+    def test_adaptive_timeouts_follow_latency_history(self):
+        """Test timeouts are learned per service, back off after a timeout and respect overrides and the cycle budget."""
+        with patch.dict(plex_monitor.latency_history, clear=True), \
+                patch.dict(plex_monitor.timeout_strikes, clear=True), \
+                patch.dict(plex_monitor.service_timeout_overrides, {"plex": (3, 60)}, clear=True), \
+                patch.dict(plex_monitor.timeout_config, {"connect_cap": 10.0, "read_cap": 20.0}):
+            # Not enough samples yet: use the caps
+            self.assertEqual(plex_monitor.service_timeout("sonarr"), (10.0, 20.0))
+            for _ in range(20):
+                plex_monitor.record_latency("sonarr", 0.03) # LAN
+                plex_monitor.record_latency("radarr", 2.0) # Slow remote link
+            self.assertEqual(plex_monitor.service_timeout("sonarr"), (0.25, 0.75))
+            self.assertEqual(plex_monitor.service_timeout("radarr"), (6.0, 6.0))
+
+            plex_monitor.record_timeout("radarr")
+            self.assertEqual(plex_monitor.service_timeout("radarr"), (10.0, 12.0))
+            plex_monitor.record_latency("radarr", 2.0)
+            self.assertEqual(plex_monitor.service_timeout("radarr"), (6.0, 6.0))
+
+            self.assertEqual(plex_monitor.service_timeout("plex"), (3, 60))
+            with patch.object(plex_monitor, 'cycle_deadline', plex_monitor.time.perf_counter() + 2):
+                connect, read = plex_monitor.service_timeout("plex")
+                self.assertLessEqual(read, 2)
+                self.assertLessEqual(connect, read)
+
+    def test_shutdown_limits_the_probe_in_flight(self):
+        """Test a shutdown cuts the remaining requests of the probe in flight down to the read floor."""
+        with patch.dict(plex_monitor.latency_history, clear=True), \
+                patch.dict(plex_monitor.timeout_config, {"connect_cap": 10.0, "read_cap": 20.0, "read_floor": 0.75}), \
+                patch.object(plex_monitor, 'shutdown_event', plex_monitor.threading.Event()), \
+                patch.object(plex_monitor, 'refresh_event', plex_monitor.threading.Event()), \
+                patch.object(plex_monitor, 'cycle_deadline', None), patch.object(plex_monitor, 'shutdown_deadline', None), \
+                patch('plex_monitor.threading.Timer'):
+            self.assertEqual(plex_monitor.service_timeout("radarr"), (10.0, 20.0))
+            plex_monitor.request_shutdown(timeout=8)
+            self.assertLessEqual(plex_monitor.service_timeout("radarr")[1], 4)
+            with patch('plex_monitor.time.perf_counter', return_value=plex_monitor.time.perf_counter() + 5):
+                self.assertEqual(plex_monitor.service_timeout("radarr"), (0.75, 0.75))
+
+    def test_skipped_service_keeps_last_status(self):
+        """Test a service skipped for the cycle budget is neither shown as failed nor alerted on."""
+        alerts_config = {"rules": [{"name": "Radarr down", "service": "radarr", "type": "state"}]}
+        with patch.dict(plex_monitor.current_statuses, clear=True), \
+                patch.object(plex_monitor, 'pending_reconcile', set()), \
+                patch.dict(plex_monitor.timeout_config, {"cycle_budget_seconds": -1}), \
+                patch.dict(plex_monitor.alert_states, clear=True), patch.dict(plex_monitor.previous_service_states, clear=True):
+            skipped = plex_monitor.collect_statuses(self.mock_config, ["radarr"])
+            self.assertEqual(skipped["radarr"]["status"], "Skipped")
+            self.assertEqual(skipped["radarr"]["error"], "Skipped (cycle budget)")
+
+            # Never polled yet: shown as not checked, not as an error
+            statuses = plex_monitor.merge_polled_statuses(skipped)
+            self.assertIn("Not checked yet", plex_monitor._format_service_field("radarr", statuses["radarr"])["value"])
+            self.assertEqual(plex_monitor.evaluate_alerts(alerts_config, statuses, now=0), [])
+
+            online = plex_monitor.ArrStatus(status="Online", queue_count=2, error=None)
+            plex_monitor.merge_polled_statuses({"radarr": online})
+            statuses = plex_monitor.merge_polled_statuses(skipped)
+            self.assertEqual(statuses["radarr"], online)
+            # It is polled again next cycle even if it is only reconciled
+            self.assertEqual(plex_monitor.pending_reconcile, {"radarr"})
+
+    def test_hung_lan_service_times_out_quickly(self):
+        """Test a learned LAN service that stops answering is detected in under a second."""
+        listener = plex_monitor.socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1) # Connections complete but are never answered
+        url = f"http://127.0.0.1:{listener.getsockname()[1]}/api"
+        try:
+            with patch.dict(plex_monitor.latency_history, {"overseerr": plex_monitor.collections.deque([0.02] * 20)}, clear=True), \
+                    patch.dict(plex_monitor.timeout_strikes, clear=True), \
+                    patch.dict(plex_monitor.service_timeout_overrides, clear=True):
+                start = plex_monitor.time.perf_counter()
+                with self.assertRaises(plex_monitor.requests.exceptions.Timeout):
+                    plex_monitor.http_get_json(url, cache=False, service="overseerr")
+                self.assertLess(plex_monitor.time.perf_counter() - start, 1.0)
+                self.assertEqual(plex_monitor.timeout_strikes["overseerr"], 1)
+        finally:
+            listener.close()
+
+    def test_wait_for_next_cycle_wakes_on_triggers(self):
+        """Test the scheduler wait returns early for refresh requests, webhook events and shutdown."""
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.object(plex_monitor, 'refresh_event', plex_monitor.threading.Event()), \
+                patch.object(plex_monitor, 'poll_now_event', plex_monitor.threading.Event()), \
+                patch.object(plex_monitor, 'shutdown_event', plex_monitor.threading.Event()):
+            trigger = os.path.join(tmp, "plex_monitor.refresh")
+            now = plex_monitor.time.time()
+            self.assertEqual(plex_monitor.wait_for_next_cycle(now - 1, trigger), "timer")
+
+            open(trigger, 'w').close()
+            self.assertEqual(plex_monitor.wait_for_next_cycle(now + 60, trigger), "refresh")
+            self.assertFalse(os.path.exists(trigger))
+
+            plex_monitor.refresh_event.set()
+            self.assertEqual(plex_monitor.wait_for_next_cycle(now + 60, trigger), "webhook")
+
+            plex_monitor.request_refresh()
+            self.assertEqual(plex_monitor.wait_for_next_cycle(now + 60, trigger), "refresh")
+
+            plex_monitor.shutdown_event.set()
+            self.assertEqual(plex_monitor.wait_for_next_cycle(now + 60, trigger), "shutdown")
+            # No new probes are started while shutting down
+            statuses = plex_monitor.collect_statuses(self.mock_config, ["plex"])
+            self.assertEqual(statuses["plex"]["error"], "Skipped (shutting down)")
+
+    @unittest.skipUnless(hasattr(plex_monitor.signal, 'SIGHUP'), "needs POSIX signals")
+    def test_sighup_refreshes_and_sigterm_exits_promptly(self):
+        """Test a running monitor polls again on SIGHUP and exits within seconds on SIGTERM."""
+        import subprocess
+        script = os.path.abspath(plex_monitor.__file__)
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "config.json"), 'w') as f:
+                json.dump({"discord_webhook_url": "YOUR_DISCORD_WEBHOOK_URL_HERE", "update_interval_seconds": 300,
+                           "services": {}, "logging": {"queue": False}}, f)
+            log_path = os.path.join(tmp, "plex_monitor.log")
+            def cycles():
+                if not os.path.exists(log_path):
+                    return 0
+                with open(log_path) as f:
+                    return f.read().count("Starting status check cycle")
+            def wait_for(condition):
+                deadline = plex_monitor.time.time() + 10
+                while not condition() and plex_monitor.time.time() < deadline:
+                    plex_monitor.time.sleep(0.05)
+                return condition()
+
+            process = subprocess.Popen([sys.executable, script], cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                self.assertTrue(wait_for(lambda: "Cycle complete" in open(log_path).read() if os.path.exists(log_path) else False))
+                process.send_signal(plex_monitor.signal.SIGHUP)
+                self.assertTrue(wait_for(lambda: cycles() == 2))
+
+                start = plex_monitor.time.time()
+                process.send_signal(plex_monitor.signal.SIGTERM)
+                self.assertEqual(process.wait(timeout=10), 0)
+                self.assertLess(plex_monitor.time.time() - start, 5)
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+            with open(log_path) as f:
+                self.assertIn("Shutdown complete.", f.read())
+
+    def test_record_then_replay_transport(self):
+        """Test recorded responses are redacted on disk and served back offline."""
+        live = plex_monitor.requests.Response()
+        live.status_code = 200
+        live.reason = "OK"
+        live.headers["Content-Type"] = "application/json"
+        live._content = b'{"queue": {"kbpersec": "10"}}'
+
+        with tempfile.TemporaryDirectory() as tmp:
+            capture = os.path.join(tmp, "capture.ndjson.gz")
+            with patch('requests.adapters.HTTPAdapter.send', return_value=live):
+                plex_monitor.start_transport({"mode": "record", "path": capture})
+                try:
+                    plex_monitor.requests.get("http://sab:8080/sabnzbd/api?mode=queue&apikey=secret")
+                finally:
+                    plex_monitor.stop_transport()
+
+            with gzip.open(capture, 'rt') as f:
+                recorded = f.read()
+            self.assertNotIn("secret", recorded)
+
+            plex_monitor.start_transport({"mode": "replay", "path": capture, "latency_scale": 0})
+            try:
+                # A different API key still matches because credentials are redacted
+                response = plex_monitor.requests.get("http://sab:8080/sabnzbd/api?apikey=other&mode=queue")
+                with self.assertRaises(plex_monitor.requests.exceptions.ConnectionError):
+                    plex_monitor.requests.get("http://unrecorded:1234/")
+            finally:
+                plex_monitor.stop_transport()
+
+        self.assertEqual(response.json(), {"queue": {"kbpersec": "10"}})
+
+    def test_replay_capture_cut_off_by_a_kill(self):
+        """Test a capture whose recorder never closed it still replays the flushed responses."""
+        live = plex_monitor.requests.Response()
+        live.status_code = 200
+        live.reason = "OK"
+        live._content = b'{"ok": true}'
+
+        with tempfile.TemporaryDirectory() as tmp:
+            capture = os.path.join(tmp, "capture.ndjson.gz")
+            killed = os.path.join(tmp, "killed.ndjson.gz")
+            with patch('requests.adapters.HTTPAdapter.send', return_value=live), \
+                    patch.object(plex_monitor, 'CAPTURE_FLUSH_SECONDS', 0):
+                plex_monitor.start_transport({"mode": "record", "path": capture})
+                try:
+                    plex_monitor.requests.get("http://tautulli:8181/api/v2?cmd=get_activity")
+                    # Copy the file as it is on disk while recording, as if the process had been killed
+                    with open(capture, 'rb') as src, open(killed, 'wb') as dst:
+                        dst.write(src.read())
+                finally:
+                    plex_monitor.stop_transport()
+
+            plex_monitor.start_transport({"mode": "replay", "path": killed, "latency_scale": 0})
+            try:
+                self.assertIsNotNone(plex_monitor.transport_state)
+                response = plex_monitor.requests.get("http://tautulli:8181/api/v2?cmd=get_activity")
+            finally:
+                plex_monitor.stop_transport()
+
+        self.assertEqual(response.json(), {"ok": True})
+
+    def test_diagnostics_capture_writes_report(self):
+        """Test a requested capture profiles the configured cycles and writes one report."""
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {"profile_cycles": 2, "directory": tmp}
+            plex_monitor.request_diagnostics()
+            for _ in range(2):
+                plex_monitor.diagnostics_begin_cycle(config)
+                plex_monitor.collect_statuses({}, services=[])
+                self.assertEqual(os.listdir(tmp), [])
+                plex_monitor.diagnostics_end_cycle(config)
+
+            reports = os.listdir(tmp)
+            self.assertEqual(len(reports), 1)
+            with open(os.path.join(tmp, reports[0])) as f:
+                report = f.read()
+            self.assertIn("=== Profile", report)
+            self.assertIn("collect_statuses", report)
+            self.assertIn("=== Top allocations", report)
+            self.assertIsNone(plex_monitor.diagnostics_state["profiler"])
+            self.assertFalse(tracemalloc.is_tracing())
+
     def test_format_discord_message(self):
         """Test format_discord_message function."""
         # Create test statuses
@@ -111,5 +849,195 @@ class TestPlexMonitor(unittest.TestCase):
         sonarr_field = next(field for field in fields if "Sonarr" in field["name"])
         self.assertIn("Error: Connection failed", sonarr_field["value"])
 
+
+# --- Long-run soak test ---
+# Number of simulated cycles; set PLEX_MONITOR_SOAK_CYCLES=100000 for the full soak
+SOAK_CYCLES = int(os.environ.get('PLEX_MONITOR_SOAK_CYCLES', 1000))
+
+
+class _SimulatedFleet:
+    """Plain stand-ins for every service (no MagicMock, which records each call).
+
+    Each cycle moves the clock on a minute, rotates queue items and download IDs,
+    and finishes one Sabnzbd job, so every cache and index sees churn.
+    """
+
+    def __init__(self):
+        self.cycle = 0
+
+    @property
+    def now(self):
+        return 1_000_000 + self.cycle * 60
+
+    def _response(self, payload, etag=None, request_headers=None):
+        response = plex_monitor.requests.Response()
+        if etag and (request_headers or {}).get('If-None-Match') == etag:
+            response.status_code = 304
+            return response
+        response.status_code = 200
+        if etag:
+            response.headers['ETag'] = etag
+        response._content = json.dumps(payload).encode()
+        return response
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        params = params or {}
+        if url.endswith('/sabnzbd/api') and params.get('mode') == "history":
+            slots = [{"nzo_id": f"SABnzbd_nzo_{self.cycle}", "completed": self.now, "status": "Completed"}]
+            return self._response({"history": {"slots": slots, "last_history_update": self.cycle}})
+        if url.endswith('/sabnzbd/api'):
+            slots = [{"nzo_id": f"SABnzbd_nzo_{self.cycle + k}", "filename": f"Show.S01E{k:02d}", "percentage": "40",
+                      "timeleft": "0:05:00", "status": "Downloading" if k == 0 else "Queued"} for k in range(3)]
+            return self._response({"queue": {"kbpersec": "2048", "mb": "700", "noofslots_total": 3, "slots": slots}})
+        if url.endswith('/api/v2'):
+            return self._response({"response": {"result": "success", "data": {"stream_count": self.cycle % 4, "total_bandwidth": 8000}}},
+                                  etag=f'"{self.cycle // 10}"', request_headers=headers)
+        if '/api/v1/request' in url:
+            return self._response({"pageInfo": {"results": self.cycle % 7}}, etag=f'"{self.cycle // 5}"', request_headers=headers)
+        return self._response({"version": "5.0"})
+
+    def plex_server(self, baseurl, token, session=None, timeout=None):
+        return _FakePlexServer(self)
+
+    def arr_api(self, host_url, api_key, timeout=None):
+        return _FakeArrApi(self)
+
+    def qbittorrent_client(self, **kwargs):
+        return _FakeQbittorrentClient(self)
+
+
+class _FakeMediaContainer:
+    def __init__(self, size):
+        self.attrib = {"size": str(size)}
+
+
+class _FakePlexServer:
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def query(self, path):
+        return _FakeMediaContainer(self.fleet.cycle % 3)
+
+
+class _FakeArrApi:
+    session = None
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def get_queue(self, page_size=None):
+        cycle = self.fleet.cycle
+        records = [{"downloadId": f"hash{cycle + k}", "title": f"Movie {cycle + k}", "size": 100, "sizeleft": 50} for k in range(3)]
+        records.append({"downloadId": f"SABnzbd_nzo_{cycle}", "title": "Show.S01E00", "size": 100, "sizeleft": 60})
+        return {"totalRecords": len(records), "records": records}
+
+
+class _FakeQbittorrentClient:
+    is_logged_in = True
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def auth_log_in(self, **kwargs):
+        pass
+
+    def auth_log_out(self, **kwargs):
+        pass
+
+    def transfer_info(self, **kwargs):
+        return {"dl_info_speed": 1024 * 1024, "up_info_speed": 2048}
+
+    def torrents_info(self, status_filter=None, **kwargs):
+        return [{}] * 3
+
+    def sync_maindata(self, rid=0, **kwargs):
+        cycle = self.fleet.cycle
+        torrents = {f"hash{cycle + 2}": {"name": "New", "progress": 0.1, "dlspeed": 0, "eta": 600, "state": "stalledDL"}}
+        return {"rid": rid + 1, "full_update": rid == 0, "torrents": torrents, "torrents_removed": [f"hash{cycle - 1}"]}
+
+
+class TestLongRunMemory(unittest.TestCase):
+    """Soak test: the monitor's retained memory must not grow with the number of cycles."""
+
+    def test_memory_is_flat_over_many_cycles(self):
+        for library in plex_monitor.SERVICE_LIBRARIES:
+            plex_monitor.load_service_library(library)
+        fleet = _SimulatedFleet()
+        config = {"services": {
+            "plex": {"url": "http://plex:32400", "token": "t"},
+            "radarr": {"url": "http://radarr:7878", "api_key": "k"},
+            "sonarr": {"url": "http://sonarr:8989", "api_key": "k"},
+            "sabnzbd": {"url": "http://sab:8080", "api_key": "k", "track_history": True},
+            "qbittorrent": {"url": "http://qbit:8080", "username": "u", "password": "p"},
+            "tautulli": {"url": "http://tautulli:8181", "api_key": "k"},
+            "overseerr": {"url": "http://overseerr:5055", "api_key": "k"},
+        }}
+        alerts_config = {"rules": [
+            {"service": "plex", "type": "state", "to": ["Offline", "Error"]},
+            {"service": "pipeline", "type": "threshold", "field": "stalled", "above": 0, "for_minutes": 5},
+        ]}
+        fresh_pipeline = {"torrents": {}, "sab_slots": {}, "rows": {}, "inputs": {}, "zero_speed_since": {}}
+
+        def run_cycle():
+            fleet.cycle += 1
+            statuses = plex_monitor.collect_statuses(config)
+            with plex_monitor.status_lock:
+                plex_monitor.current_statuses.update(statuses)
+            plex_monitor.apply_webhook_event("overseerr", {"notification_type": "MEDIA_PENDING"})
+            statuses = dict(plex_monitor.current_statuses)
+            statuses["pipeline"] = plex_monitor.update_pipeline(statuses, now=fleet.now)
+            plex_monitor.evaluate_alerts(alerts_config, statuses, now=fleet.now)
+            plex_monitor.format_discord_message(statuses)
+            plex_monitor._snapshot_json({"timestamp": fleet.now, "statuses": statuses})
+            return statuses
+
+        state = [plex_monitor.response_cache, plex_monitor.current_statuses, plex_monitor.alert_states,
+                 plex_monitor.previous_service_states, plex_monitor.sabnzbd_history_state,
+                 plex_monitor.qbittorrent_sync_state, plex_monitor.rendered_fields]
+        with patch.object(plex_monitor, 'get_http_session', lambda: fleet), \
+                patch.object(plex_monitor, 'PlexServer', fleet.plex_server), \
+                patch.object(plex_monitor, 'RadarrAPI', fleet.arr_api), \
+                patch.object(plex_monitor, 'SonarrAPI', fleet.arr_api), \
+                patch.object(plex_monitor.qbittorrentapi, 'Client', fleet.qbittorrent_client), \
+                patch.object(plex_monitor.time, 'time', lambda: fleet.now), \
+                patch.object(plex_monitor, 'pipeline_state', fresh_pipeline), \
+                patch.dict(plex_monitor.pipeline_config, {"enabled": True}), \
+                patch.dict(plex_monitor.http_cache_config, {"enabled": True, "ttl_seconds": 300}), \
+                patch.object(plex_monitor, 'pending_reconcile', set()):
+            for mapping in state:
+                self.addCleanup(mapping.update, dict(mapping))
+                self.addCleanup(mapping.clear)
+                mapping.clear()
+            plex_monitor.logging.disable(plex_monitor.logging.CRITICAL)
+            self.addCleanup(plex_monitor.logging.disable, plex_monitor.logging.NOTSET)
+
+            warmup = max(100, SOAK_CYCLES // 10)
+            for _ in range(warmup):
+                run_cycle()
+            plex_monitor.gc.collect()
+            peak_rss = plex_monitor.resource.getrusage(plex_monitor.resource.RUSAGE_SELF).ru_maxrss if plex_monitor.resource else 0
+            tracemalloc.start()
+            try:
+                baseline = tracemalloc.get_traced_memory()[0]
+                for _ in range(SOAK_CYCLES - warmup):
+                    statuses = run_cycle()
+                plex_monitor.gc.collect()
+                growth = tracemalloc.get_traced_memory()[0] - baseline
+            finally:
+                tracemalloc.stop()
+            if plex_monitor.resource:
+                peak_rss_growth = plex_monitor.resource.getrusage(plex_monitor.resource.RUSAGE_SELF).ru_maxrss - peak_rss
+
+            self.assertEqual({service: data.get('error') for service, data in statuses.items() if data.get('error')}, {})
+            # Every per-item index stays bounded by the live data, not the run length
+            self.assertEqual(len(plex_monitor.pipeline_state["rows"]), 4)
+            self.assertLessEqual(len(plex_monitor.sabnzbd_history_state["http://sab:8080"]["jobs"]), 61)
+            self.assertLessEqual(len(plex_monitor.qbittorrent_sync_state["http://qbit:8080"]["torrents"]), 4)
+            self.assertEqual(plex_monitor.gc.garbage, [])
+        self.assertLess(growth, 64 * 1024, f"retained memory grew by {growth} bytes over {SOAK_CYCLES - warmup} cycles")
+        if plex_monitor.resource and sys.platform.startswith('linux'):
+            # ru_maxrss is in KiB on Linux; allow for tracemalloc's own bookkeeping
+            self.assertLess(peak_rss_growth, 16 * 1024, f"peak RSS grew by {peak_rss_growth} KiB")
+
 if __name__ == '__main__':
     unittest.main()
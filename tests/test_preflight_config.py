@@ -0,0 +1,105 @@
+import unittest
+import http.server
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+from unittest.mock import patch
+
+# Add parent directory to path to import preflight_config
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import preflight_config
+
+class _FakeServiceHandler(http.server.BaseHTTPRequestHandler):
+    """Answers like Radarr's system status and Sabnzbd's queue API."""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path.startswith('/sabnzbd/api?'):
+            status = 200
+            body = json.dumps({"queue": {"slots": []}} if 'apikey=good' in self.path else {"status": False, "error": "API Key Incorrect"}).encode()
+        elif self.path.startswith('/api/v3/system/status'):
+            status = 200 if self.headers.get('X-Api-Key') == 'good' else 401
+            body = json.dumps({"version": "5.0"}).encode()
+        else:
+            status, body = 404, b'{}'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPreflightConfig(unittest.TestCase):
+    """Test cases for the connectivity pre-flight check."""
+
+    def setUp(self):
+        """Start a fake Radarr and reserve a port nothing listens on."""
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _FakeServiceHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.closed_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_run_preflight_reports_reachability_auth_and_latency(self):
+        """Test services are classified as healthy, rejected or unreachable, and placeholders are skipped."""
+        services = {
+            "radarr": {"url": self.url, "api_key": "good"},
+            "sonarr": {"url": self.url, "api_key": "bad"},
+            "overseerr": {"url": self.closed_url, "api_key": "key"},
+            "sabnzbd": {"url": self.url, "api_key": "good"},
+            "tautulli": {"url": "http://YOUR_TAUTULLI_IP:8181", "api_key": "YOUR_TAUTULLI_API_KEY"},
+        }
+        results = {result["service"]: result for result in preflight_config.run_preflight(services, timeout=2, samples=3)}
+
+        self.assertEqual(set(results), {"radarr", "sonarr", "overseerr", "sabnzbd"})
+        self.assertTrue(results["radarr"]["authenticated"])
+        self.assertEqual(len(results["radarr"]["latency_ms"]), 3)
+        self.assertEqual(preflight_config.suggested_timeout(results["radarr"]), [0.25, 0.75])
+        # The config's timeouts section is honoured
+        self.assertEqual(preflight_config.suggested_timeout(results["radarr"], {"read_floor": 2}), [0.25, 2])
+
+        # Sabnzbd is checked at the endpoint the monitor uses, without downloading the whole queue
+        self.assertTrue(results["sabnzbd"]["authenticated"])
+        sabnzbd_requests = [path for path in self.server.requests if path.startswith('/sabnzbd/api?')]
+        self.assertEqual(len(sabnzbd_requests), 3)
+        self.assertIn('limit=1', sabnzbd_requests[0])
+
+        self.assertTrue(results["sonarr"]["reachable"])
+        self.assertFalse(results["sonarr"]["authenticated"])
+        self.assertIn("Unauthorized", results["sonarr"]["error"])
+        self.assertEqual(results["sonarr"]["latency_ms"], [])
+
+        self.assertFalse(results["overseerr"]["reachable"])
+        self.assertIn("Connection failed", results["overseerr"]["error"])
+        self.assertEqual(preflight_config.suggested_update_interval(list(results.values())), preflight_config.MIN_UPDATE_INTERVAL)
+
+    def test_preflight_exit_status(self):
+        """Test the command exits non-zero when any configured service fails."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "config.json")
+            def check(services):
+                with open(path, "w") as f:
+                    json.dump({"services": services}, f)
+                with patch('builtins.print'):
+                    return preflight_config.main([path, "--timeout", "2", "--samples", "1"])
+
+            self.assertEqual(check({"radarr": {"url": self.url, "api_key": "good"}}), 0)
+            self.assertEqual(check({"radarr": {"url": self.url, "api_key": "good"},
+                                    "sonarr": {"url": self.url, "api_key": "bad"}}), 1)
+            self.assertEqual(check({}), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,8 +10,14 @@ import sys
 import shutil
 from datetime import datetime
 
-def update_config():
-    """Update an existing config.json file with new options from the template."""
+from preflight_config import preflight
+
+def update_config(run_preflight=True):
+    """Update an existing config.json file with new options from the template.
+
+    Afterwards every configured service is checked with preflight_config.py,
+    unless run_preflight is False (the --no-preflight option).
+    """
     # Check if config.json exists
     if not os.path.exists('config.json'):
         print("Error: config.json not found. Please run setup_config.py to create a new config file.")
@@ -83,13 +89,15 @@ def update_config():
             with open('config.json', 'w') as f:
                 json.dump(config, f, indent=2)
             print("\nConfiguration updated successfully.")
-            return 0
         except Exception as e:
             print(f"Error saving config.json: {e}")
             return 1
     else:
         print("\nNo updates needed. Your configuration is already up to date.")
-        return 0
+    
+    if run_preflight:
+        return preflight('config.json')
+    return 0
 
 if __name__ == '__main__':
-    sys.exit(update_config())
+    sys.exit(update_config(run_preflight='--no-preflight' not in sys.argv[1:]))